@@ -0,0 +1,89 @@
+"""
+Escritura de los archivos generados en una sola pasada.
+
+El prompt (encabezado + transcripción) nunca se construye completo en
+memoria: el encabezado y los fragmentos de la transcripción se escriben
+directamente en el archivo por bloques. El JSON se genera de forma
+incremental escapando cada bloque con el codificador en C de la librería
+estándar, sin pretty-print salvo que se pida.
+"""
+
+import json
+import os
+from json.encoder import encode_basestring
+from typing import Any, Dict, List, Optional
+
+# Fragmentos que se unen y escriben en cada llamada a write()
+CHUNK_FRAGMENTS = 512
+
+PROMPT_HEADER = """I'm going to give you the full transcript of a YouTube video. Please read it and write a summary in Spanish that is clear, well-structured, and easy to understand for someone who hasn't watched the video. It doesn't need to be super short; instead, focus on fully developing the main ideas, key points, and any final conclusions or takeaways. If possible, organize the summary into thematic sections or parts of the content, so it's easier to follow.
+
+Full transcript:
+"""
+
+
+def transcript_length(fragments: List[str]) -> int:
+    """Longitud del texto unido por espacios, sin construirlo."""
+    if not fragments:
+        return 0
+    return sum(len(fragment) for fragment in fragments) + len(fragments) - 1
+
+
+def _chunks(fragments: List[str]):
+    """Bloques del texto unido por espacios, en orden."""
+    for i in range(0, len(fragments), CHUNK_FRAGMENTS):
+        chunk = " ".join(fragments[i:i + CHUNK_FRAGMENTS])
+        yield chunk if i == 0 else " " + chunk
+
+
+def write_txt(path: str, fragments: List[str]):
+    """Escribe el prompt en texto plano."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(PROMPT_HEADER)
+        for chunk in _chunks(fragments):
+            f.write(chunk)
+
+
+def append_txt(path: str, fragments: List[str], continuation: bool) -> int:
+    """
+    Añade fragmentos al final de un archivo TXT (transcripciones en directo).
+    Con `continuation` se antepone el espacio que los separa del texto previo.
+    Devuelve el tamaño del archivo en bytes tras escribir.
+    """
+    with open(path, "a", encoding="utf-8") as f:
+        if continuation and fragments:
+            f.write(" ")
+        for chunk in _chunks(fragments):
+            f.write(chunk)
+        f.flush()
+        return os.fstat(f.fileno()).st_size
+
+
+def write_json(path: str, head: Dict[str, Any], fragments: List[str], tail: Dict[str, Any],
+               indent: Optional[int] = None):
+    """
+    Escribe `{**head, "prompt": <prompt>, **tail}` como JSON. Los valores de
+    `head` y `tail` son escalares; el prompt se escapa bloque a bloque, lo
+    que da el mismo resultado que escaparlo entero porque el escape de JSON
+    es carácter a carácter.
+    """
+    if indent:
+        opening, separator, key_separator, closing = "{\n" + " " * indent, ",\n" + " " * indent, ": ", "\n}"
+    else:
+        opening, separator, key_separator, closing = "{", ",", ":", "}"
+
+    def member(key: str, value: Any) -> str:
+        return encode_basestring(key) + key_separator + json.dumps(value, ensure_ascii=False)
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(opening)
+        for key, value in head.items():
+            f.write(member(key, value) + separator)
+        f.write(encode_basestring("prompt") + key_separator + '"')
+        f.write(encode_basestring(PROMPT_HEADER)[1:-1])
+        for chunk in _chunks(fragments):
+            f.write(encode_basestring(chunk)[1:-1])
+        f.write('"')
+        for key, value in tail.items():
+            f.write(separator + member(key, value))
+        f.write(closing)
@@ -0,0 +1 @@
+"""Benchmarks offline de YouTube Summary."""
@@ -0,0 +1,191 @@
+"""
+Suite de benchmarks offline.
+
+Mide, contra el stand-in local y las fixtures deterministas:
+- throughput del parseo (parsear_lineas_subtitulo + extraer_texto_de_p)
+- latencia end-to-end de process_video
+- pico de memoria de process_video (tracemalloc)
+
+Uso:
+    python -m benchmarks.bench                        # todas las fixtures
+    python -m benchmarks.bench --sizes 1m 10m --formats ttml
+    python -m benchmarks.bench --compare benchmarks/results/anterior.json
+
+Los resultados se guardan en benchmarks/results/<fecha>_<commit>.json.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks import fixtures
+from benchmarks.standin import YouTubeStandIn
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def bench_parse(processor, fmt: str, minutes: int, repeat: int) -> dict:
+    """Throughput del parseo sobre el contenido ya descargado."""
+    if fmt == "m3u8":
+        contents = [fixtures.render_segment(minutes, i) for i in range(fixtures.segment_count(minutes))]
+    else:
+        contents = [fixtures.render_captions(fmt, minutes)]
+    size = sum(len(c.encode("utf-8")) for c in contents)
+
+    durations = []
+    fragments = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        lines = []
+        for content in contents:
+            lines.extend(processor.parsear_lineas_subtitulo(content))
+        fragments = len(processor.extraer_texto_de_p(lines))
+        durations.append(time.perf_counter() - start)
+
+    best = min(durations)
+    return {
+        "bytes": size,
+        "fragments": fragments,
+        "seconds_min": best,
+        "seconds_median": statistics.median(durations),
+        "mb_per_second": size / best / 1_000_000 if best else None,
+    }
+
+
+def bench_process_video(processor, video_id: str, repeat: int) -> dict:
+    """Latencia end-to-end y pico de memoria de process_video."""
+    durations = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        result = processor.process_video(video_id, f"bench-{video_id}-{i}", "txt")
+        durations.append(time.perf_counter() - start)
+        if not result["success"]:
+            return {"error": result["message"]}
+
+    tracemalloc.start()
+    processor.process_video(video_id, f"bench-{video_id}-mem", "txt")
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "seconds_min": min(durations),
+        "seconds_median": statistics.median(durations),
+        "seconds_p95": _percentile(durations, 95),
+        "peak_memory_bytes": peak,
+    }
+
+
+def run(formats, sizes, repeat: int, latency: float, failure_rate: float) -> dict:
+    from search_index import SearchIndex
+    from storage import LocalStorage
+    from store import SharedStore
+    from youtube_processor import YouTubeProcessor
+
+    results = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {"repeat": repeat, "latency": latency, "failure_rate": failure_rate},
+        "cases": {},
+    }
+
+    with YouTubeStandIn(latency=latency, failure_rate=failure_rate) as standin, \
+            tempfile.TemporaryDirectory() as output_dir:
+        os.environ["YOUTUBE_STANDIN_URL"] = standin.base_url
+        processor = YouTubeProcessor(
+            store=SharedStore(os.path.join(output_dir, "store.db")),
+            storage=LocalStorage(output_dir),
+            search_index=SearchIndex(os.path.join(output_dir, "search.db")),
+        )
+        processor.output_dir = output_dir
+        # Sin caché: cada repetición debe recorrer el pipeline completo
+        processor.cache_ttl = 0
+
+        for fmt in formats:
+            for size in sizes:
+                minutes = fixtures.SIZES[size]
+                video_id = fixtures.fixture_video_id(fmt, minutes)
+                # Las fixtures largas se repiten menos para acotar la duración total
+                case_repeat = max(1, repeat // 5) if minutes >= 600 else repeat
+                print(f"⏱️  {fmt} {size} ({video_id})...", file=sys.stderr)
+                results["cases"][f"{fmt}/{size}"] = {
+                    "video_id": video_id,
+                    "parse": bench_parse(processor, fmt, minutes, case_repeat),
+                    "process_video": bench_process_video(processor, video_id, case_repeat),
+                }
+        results["standin_requests"] = standin.requests
+
+    return results
+
+
+def compare(current: dict, previous: dict):
+    """Imprime el ratio actual/anterior de las métricas principales."""
+    print(f"\nComparación {previous.get('commit')} -> {current.get('commit')}")
+    for case, data in current["cases"].items():
+        old = previous.get("cases", {}).get(case)
+        if not old:
+            continue
+        for section, metric in (("parse", "seconds_min"), ("process_video", "seconds_min"),
+                                ("process_video", "peak_memory_bytes")):
+            new_value = data.get(section, {}).get(metric)
+            old_value = old.get(section, {}).get(metric)
+            if new_value and old_value:
+                print(f"  {case:12} {section}.{metric:18} x{new_value / old_value:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks offline de YouTubeProcessor")
+    parser.add_argument("--formats", nargs="+", default=list(fixtures.FORMATS), choices=fixtures.FORMATS)
+    parser.add_argument("--sizes", nargs="+", default=list(fixtures.SIZES), choices=list(fixtures.SIZES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.0, help="Latencia del stand-in en segundos")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probabilidad de fallo del stand-in")
+    parser.add_argument("--output", help="Ruta del JSON de resultados")
+    parser.add_argument("--compare", help="JSON de resultados anterior para comparar")
+    args = parser.parse_args()
+
+    # Los logs por etapa distorsionan las mediciones
+    logging.basicConfig(level=logging.WARNING)
+
+    results = run(args.formats, args.sizes, args.repeat, args.latency, args.failure_rate)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}_{results['commit']}.json"
+    )
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Resultados guardados en {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Fixtures deterministas para los benchmarks offline.
+
+Los subtítulos se generan a partir de una semilla fija, así dos ejecuciones en
+commits distintos procesan exactamente el mismo contenido. Cada fixture se
+identifica con un video_id de 11 caracteres que codifica formato y duración,
+por ejemplo `vtt_0060min` (VTT de 1 hora) o `m3u80600min` (playlist de 10 horas).
+Los ids `live` (p. ej. `live0060min`) simulan un directo de esa duración cuya
+playlist M3U8 crece con el tiempo.
+"""
+
+import json
+import os
+import random
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+FORMATS = ("vtt", "srt", "ttml", "m3u8")
+
+# Directo simulado: no forma parte de FORMATS porque no es un formato de benchmark
+LIVE_FORMAT = "live"
+# Segmentos visibles en la ventana deslizante de la playlist en directo
+LIVE_WINDOW_SEGMENTS = 5
+
+# Duraciones en minutos: de 1 minuto a 10 horas
+SIZES = {"1m": 1, "10m": 10, "1h": 60, "10h": 600}
+
+# Cada cue dura 3 segundos y cada segmento M3U8 cubre 60 segundos
+CUE_SECONDS = 3
+SEGMENT_SECONDS = 60
+
+_WORDS = (
+    "el la de que y en un una los las por con para como pero más este video "
+    "vamos a ver cómo funciona sistema datos flujo servidor cliente proceso "
+    "ejemplo importante siguiente paso resultado configuración automatización "
+    "herramienta producción error notificación tiempo manera forma parte"
+).split()
+
+
+def fixture_video_id(fmt: str, minutes: int) -> str:
+    """Construye el video_id (11 caracteres) de una fixture."""
+    return f"{fmt:_<4}{minutes:04d}min"
+
+
+def parse_fixture_video_id(video_id: str) -> Optional[Tuple[str, int]]:
+    """Devuelve (formato, minutos) de un video_id de fixture, o None."""
+    if len(video_id) != 11 or not video_id.endswith("min"):
+        return None
+    fmt = video_id[:4].rstrip("_")
+    if (fmt not in FORMATS and fmt != LIVE_FORMAT) or not video_id[4:8].isdigit():
+        return None
+    return fmt, int(video_id[4:8])
+
+
+def _timestamp(seconds: float, sep: str = ".") -> str:
+    millis = int(round(seconds * 1000))
+    hours, rest = divmod(millis, 3_600_000)
+    minutes, rest = divmod(rest, 60_000)
+    secs, millis = divmod(rest, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{sep}{millis:03d}"
+
+
+def _cue_texts(start: int, end: int):
+    """Genera (inicio, texto) de los cues en el rango [start, end) segundos."""
+    for cue_start in range(start, end, CUE_SECONDS):
+        # Semilla por cue: cualquier rango produce siempre el mismo texto
+        rnd = random.Random(cue_start)
+        words = rnd.choices(_WORDS, k=rnd.randint(6, 12))
+        yield cue_start, " ".join(words)
+
+
+def render_vtt(start: int, end: int) -> str:
+    parts = ["WEBVTT", "Kind: captions", "Language: es", ""]
+    for cue_start, text in _cue_texts(start, end):
+        parts.append(f"{_timestamp(cue_start)} --> {_timestamp(cue_start + CUE_SECONDS)}")
+        parts.append(text)
+        parts.append("")
+    return "\n".join(parts)
+
+
+def render_srt(start: int, end: int) -> str:
+    parts = []
+    for index, (cue_start, text) in enumerate(_cue_texts(start, end), 1):
+        parts.append(str(index))
+        parts.append(f"{_timestamp(cue_start, ',')} --> {_timestamp(cue_start + CUE_SECONDS, ',')}")
+        parts.append(text)
+        parts.append("")
+    return "\n".join(parts)
+
+
+def render_ttml(start: int, end: int) -> str:
+    parts = [
+        '<?xml version="1.0" encoding="utf-8" ?><tt xml:lang="es" xmlns="http://www.w3.org/ns/ttml" '
+        'xmlns:tts="http://www.w3.org/ns/ttml#styling"><head><styling><style xml:id="s1" '
+        'tts:textAlign="center" /></styling></head><body><div>'
+    ]
+    for cue_start, text in _cue_texts(start, end):
+        parts.append(
+            f'<p begin="{_timestamp(cue_start)}" end="{_timestamp(cue_start + CUE_SECONDS)}" '
+            f'style="s1">{text}</p>'
+        )
+    parts.append("</div></body></tt>")
+    return "\n".join(parts)
+
+
+@lru_cache(maxsize=32)
+def render_captions(fmt: str, minutes: int) -> str:
+    """Contenido completo de subtítulos para una fixture VTT/SRT/TTML."""
+    renderer = {"vtt": render_vtt, "srt": render_srt, "ttml": render_ttml}[fmt]
+    return renderer(0, minutes * 60)
+
+
+def segment_count(minutes: int) -> int:
+    return -(-minutes * 60 // SEGMENT_SECONDS)
+
+
+@lru_cache(maxsize=4096)
+def render_segment(minutes: int, index: int) -> str:
+    """Segmento VTT `index` de una playlist M3U8."""
+    start = index * SEGMENT_SECONDS
+    return render_vtt(start, min(start + SEGMENT_SECONDS, minutes * 60))
+
+
+def render_playlist(video_id: str, minutes: int, base_url: str) -> str:
+    """Playlist M3U8 cuyos segmentos apuntan al stand-in."""
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:3",
+        f"#EXT-X-TARGETDURATION:{SEGMENT_SECONDS}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+        "#EXT-X-PLAYLIST-TYPE:VOD",
+    ]
+    for index in range(segment_count(minutes)):
+        lines.append(f"#EXTINF:{SEGMENT_SECONDS}.0,")
+        lines.append(f"{base_url}/api/timedtext?v={video_id}&fmt=vtt&seg={index}")
+    lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
+
+
+def render_live_playlist(video_id: str, minutes: int, base_url: str, available: int,
+                         target_duration: int) -> str:
+    """
+    Playlist M3U8 de un directo con `available` segmentos publicados. Solo
+    muestra los últimos LIVE_WINDOW_SEGMENTS y añade EXT-X-ENDLIST cuando el
+    directo termina.
+    """
+    total = segment_count(minutes)
+    available = min(available, total)
+    first = max(0, available - LIVE_WINDOW_SEGMENTS)
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:3",
+        f"#EXT-X-TARGETDURATION:{target_duration}",
+        f"#EXT-X-MEDIA-SEQUENCE:{first}",
+    ]
+    for index in range(first, available):
+        lines.append(f"#EXTINF:{SEGMENT_SECONDS}.0,")
+        lines.append(f"{base_url}/api/timedtext?v={video_id}&fmt=vtt&seg={index}")
+    if available >= total:
+        lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
+
+
+@lru_cache(maxsize=1)
+def _extract_info_template() -> str:
+    with open(os.path.join(FIXTURES_DIR, "extract_info.json"), encoding="utf-8") as f:
+        return f.read()
+
+
+def load_extract_info(video_id: str, base_url: str) -> Dict:
+    """
+    Payload grabado de `extract_info` adaptado a la fixture: solo se deja la
+    pista del formato de la fixture, con URLs que apuntan al stand-in.
+    """
+    fmt, minutes = parse_fixture_video_id(video_id)
+    raw = (
+        _extract_info_template()
+        .replace('"{DURATION}"', str(minutes * 60))
+        .replace("{VIDEO_ID}", video_id)
+        .replace("{BASE_URL}", base_url.rstrip("/"))
+    )
+    info = json.loads(raw)
+    if fmt == LIVE_FORMAT:
+        info.update({"duration": None, "is_live": True, "live_status": "is_live"})
+    for lang, entries in info["automatic_captions"].items():
+        if fmt in ("m3u8", LIVE_FORMAT):
+            kept = [e for e in entries if e.get("protocol") == "m3u8_native"]
+        else:
+            kept = [e for e in entries if e["ext"] == fmt and "protocol" not in e]
+        # Las pistas json3/srv1 se mantienen delante, como en el payload real
+        info["automatic_captions"][lang] = [e for e in entries if e["ext"] in ("json3", "srv1")] + kept
+    return info
+
+
+def fixture_size_bytes(fmt: str, minutes: int) -> int:
+    """Tamaño total en bytes de los subtítulos de una fixture."""
+    if fmt == "m3u8":
+        return sum(len(render_segment(minutes, i).encode("utf-8")) for i in range(segment_count(minutes)))
+    return len(render_captions(fmt, minutes).encode("utf-8"))
@@ -0,0 +1,158 @@
+"""
+Benchmark del índice de búsqueda.
+
+Indexa varias copias de la transcripción de una fixture (por defecto la TTML
+de 10 horas, con tiempos de cue) y mide la latencia de `SearchIndex.search`
+para consultas de un término, dos términos y prefijo. Se repite con las
+copias indexadas sin tiempos (`starts=None`), como los formatos VTT/SRT.
+
+El vocabulario de las fixtures es pequeño: sus términos aparecen en todas las
+copias (el peor caso, todo el corpus coincide). Una de cada RARE_EVERY copias
+lleva además RARE_TERM, para medir consultas selectivas.
+
+Se publica:
+- tiempo de indexación por copia y tamaño del índice
+- latencia mínima y mediana de cada consulta
+
+Uso:
+    python -m benchmarks.search
+    python -m benchmarks.search --copies 5 --repeat 10
+    python -m benchmarks.search --fixture ttml0010min --copies 100000 --variants untimed
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks import fixtures
+from benchmarks.bench import RESULTS_DIR, _git_commit
+from benchmarks.standin import YouTubeStandIn
+
+DEFAULT_FIXTURE = fixtures.fixture_video_id("ttml", fixtures.SIZES["10h"])
+RARE_TERM = "kubernetes"
+RARE_EVERY = 1000
+QUERIES = ("servidor", "servidor cliente", "automatiza*", RARE_TERM, f"servidor {RARE_TERM}")
+
+
+def _db_size(path: str) -> int:
+    return sum(os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix))
+
+
+def bench_index(fragments, starts, path: str, copies: int, repeat: int) -> dict:
+    from search_index import SearchIndex
+
+    index = SearchIndex(path)
+    durations = []
+    rare_fragments = fragments + [f"despliegue con {RARE_TERM}"]
+    rare_starts = starts + [starts[-1]] if starts else None
+    for i in range(copies):
+        rare = i % RARE_EVERY == 0
+        start = time.perf_counter()
+        index.add(f"bench-{i}", "bench", rare_fragments if rare else fragments, rare_starts if rare else starts)
+        durations.append(time.perf_counter() - start)
+
+    queries = {}
+    for query in QUERIES:
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results = index.search(query, limit=20)
+            latencies.append(time.perf_counter() - start)
+        queries[query] = {
+            "results": len(results),
+            "matches": sum(len(r["matches"]) for r in results),
+            "seconds_min": min(latencies),
+            "seconds_median": statistics.median(latencies),
+        }
+    return {
+        "copies": copies,
+        "add_seconds_median": statistics.median(durations),
+        "index_bytes": _db_size(path),
+        "queries": queries,
+    }
+
+
+def run(video_id: str, copies: int, repeat: int, variants=("timed", "untimed")) -> dict:
+    from search_index import SearchIndex
+    from storage import LocalStorage
+    from store import SharedStore
+    from youtube_processor import YouTubeProcessor
+
+    results = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "fixture": video_id,
+        "repeat": repeat,
+        "variants": {},
+    }
+
+    with YouTubeStandIn() as standin, tempfile.TemporaryDirectory() as output_dir:
+        os.environ["YOUTUBE_STANDIN_URL"] = standin.base_url
+        processor = YouTubeProcessor(
+            store=SharedStore(os.path.join(output_dir, "store.db")),
+            storage=LocalStorage(output_dir),
+            search_index=SearchIndex(os.path.join(output_dir, "search.db")),
+        )
+        processor.cache_ttl = 0
+        cues, error = processor.obtener_fragmentos(video_id)
+        if not cues:
+            raise RuntimeError(error)
+        results["transcript_fragments"] = len(cues["fragments"])
+        results["transcript_characters"] = sum(len(f) for f in cues["fragments"])
+
+        for variant, starts in (("timed", cues["starts"]), ("untimed", None)):
+            if variant not in variants:
+                continue
+            print(f"⏱️  {video_id} {variant} x{copies}...", file=sys.stderr)
+            results["variants"][variant] = bench_index(
+                cues["fragments"], starts, os.path.join(output_dir, f"search_{variant}.db"), copies, repeat
+            )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del índice de búsqueda")
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE, help="video_id de la fixture")
+    parser.add_argument("--copies", type=int, default=20, help="Copias indexadas de la transcripción")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--variants", nargs="+", choices=["timed", "untimed"], default=["timed", "untimed"],
+                        help="Indexar las copias con tiempos de cue, sin ellos o ambas")
+    parser.add_argument("--output", help="Ruta del JSON de resultados")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    results = run(args.fixture, args.copies, args.repeat, args.variants)
+    for variant, data in results["variants"].items():
+        print(
+            f"  {variant:8} indexación {data['add_seconds_median'] * 1000:8.1f} ms/copia  "
+            f"índice {data['index_bytes'] / 1_000_000:7.1f} MB"
+        )
+        for query, q in data["queries"].items():
+            print(
+                f"           {query!r:22} {q['seconds_min'] * 1000:9.1f} ms  "
+                f"(mediana {q['seconds_median'] * 1000:9.1f} ms, {q['results']} resultados, "
+                f"{q['matches']} cues)"
+            )
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"search_{datetime.now():%Y%m%d-%H%M%S}_{results['commit']}.json"
+    )
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Resultados guardados en {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Stand-in local de YouTube para benchmarks y pruebas de carga offline.
+
+Sirve el payload grabado de `extract_info` y los endpoints timedtext con las
+fixtures de benchmarks/fixtures.py, con latencia y fallos configurables.
+Los videos `live...` simulan un directo: su playlist publica segmentos nuevos
+a medida que pasa el tiempo desde la primera petición (acelerado por
+`live_speed`). `/flat` sirve la extracción plana de canales y playlists
+(`@fixtures` por defecto); `add_upload` simula la subida de un video nuevo.
+
+El procesador lo usa cuando YOUTUBE_STANDIN_URL apunta a él:
+
+    python -m benchmarks.standin --port 8765 --latency 0.05 --failure-rate 0.1
+    YOUTUBE_STANDIN_URL=http://127.0.0.1:8765 python main.py
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks import fixtures
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "YouTubeStandIn/1.0"
+    protocol_version = "HTTP/1.1"
+    # Cabeceras y cuerpo van en escrituras separadas: con Nagle activo, cada
+    # petición sobre una conexión reutilizada esperaría el ACK retrasado (~40 ms)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        # Silencioso: el log por petición distorsiona las mediciones
+        pass
+
+    def _send(self, status: int, body: str, content_type: str = "text/plain; charset=utf-8"):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        standin = self.server.standin
+        standin.record_request()
+
+        if standin.latency:
+            time.sleep(standin.latency)
+        failure = standin.pick_failure()
+        if failure:
+            self._send(failure, f"Fallo inyectado ({failure})")
+            return
+
+        parsed = urlparse(self.path)
+        path = parsed.path
+        query = parse_qs(parsed.query)
+
+        if path.startswith("/info/"):
+            video_id = path[len("/info/"):]
+            if not fixtures.parse_fixture_video_id(video_id):
+                self._send(404, "ERROR: [youtube] Video unavailable")
+                return
+            info = fixtures.load_extract_info(video_id, standin.base_url)
+            if info.get("is_live"):
+                standin.live_segments_available(video_id)
+            self._send(200, json.dumps(info), "application/json")
+        elif path == "/flat":
+            source = query.get("url", [""])[0]
+            entries = standin.channel_entries(source)
+            if entries is None:
+                self._send(404, f"ERROR: [youtube:tab] {source}: This channel does not exist")
+                return
+            limit = int(query.get("limit", [len(entries)])[0])
+            payload = {
+                "_type": "playlist",
+                "id": source,
+                "entries": [
+                    {
+                        "_type": "url",
+                        "ie_key": "Youtube",
+                        "id": video_id,
+                        "url": f"https://www.youtube.com/watch?v={video_id}",
+                        "title": f"Fixture {video_id}",
+                    }
+                    for video_id in entries[:limit]
+                ],
+            }
+            self._send(200, json.dumps(payload), "application/json")
+        elif path.startswith("/api/timedtext/playlist/"):
+            video_id = path.split("/")[4]
+            parsed_id = fixtures.parse_fixture_video_id(video_id)
+            if not parsed_id:
+                self._send(404, "Not Found")
+                return
+            fmt, minutes = parsed_id
+            if fmt == fixtures.LIVE_FORMAT:
+                playlist = fixtures.render_live_playlist(
+                    video_id, minutes, standin.base_url,
+                    standin.live_segments_available(video_id), standin.live_target_duration,
+                )
+            else:
+                playlist = fixtures.render_playlist(video_id, minutes, standin.base_url)
+            self._send(200, playlist, "application/vnd.apple.mpegurl")
+        elif path == "/api/timedtext":
+            parsed_id = fixtures.parse_fixture_video_id(query.get("v", [""])[0])
+            if not parsed_id:
+                self._send(404, "Not Found")
+                return
+            fmt, minutes = parsed_id
+            if "seg" in query:
+                self._send(200, fixtures.render_segment(minutes, int(query["seg"][0])), "text/vtt; charset=utf-8")
+            else:
+                self._send(200, fixtures.render_captions(query.get("fmt", [fmt])[0], minutes))
+        else:
+            self._send(404, "Not Found")
+
+
+DEFAULT_CHANNEL_UPLOADS = (
+    "ttml0010min", "vtt_0010min", "srt_0010min", "m3u80010min", "ttml0001min",
+)
+
+
+class YouTubeStandIn:
+    """
+    Servidor HTTP en un hilo de fondo.
+
+    latency: segundos de espera añadidos a cada respuesta.
+    failure_rate: probabilidad (0..1) de responder con un error inyectado.
+    failure_statuses: códigos usados para los fallos inyectados.
+    live_speed: segundos de directo simulado por cada segundo real.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 failure_rate: float = 0.0, failure_statuses=(500, 429), seed: int = 0,
+                 live_speed: float = 60.0):
+        self.latency = latency
+        self.live_speed = live_speed
+        self._live_started = {}
+        # Canales simulados: subidas de la más reciente a la más antigua
+        self.channels = {"@fixtures": list(DEFAULT_CHANNEL_UPLOADS)}
+        self.failure_rate = failure_rate
+        self.failure_statuses = tuple(failure_statuses)
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.standin = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def pick_failure(self):
+        if not self.failure_rate:
+            return None
+        with self._lock:
+            if self._random.random() < self.failure_rate:
+                return self._random.choice(self.failure_statuses)
+        return None
+
+    @staticmethod
+    def _channel_key(source: str) -> str:
+        """'https://www.youtube.com/@canal/videos' -> '@canal'"""
+        parts = [p for p in urlparse(source).path.split("/") if p]
+        if parts and parts[-1] in ("videos", "streams", "shorts", "featured"):
+            parts = parts[:-1]
+        if parts == ["playlist"]:
+            return parse_qs(urlparse(source).query).get("list", [""])[0]
+        return parts[-1] if parts else source
+
+    def channel_entries(self, source: str):
+        with self._lock:
+            entries = self.channels.get(self._channel_key(source))
+            return list(entries) if entries is not None else None
+
+    def add_upload(self, channel: str, video_id: str):
+        """Publica `video_id` como la subida más reciente de `channel`."""
+        with self._lock:
+            self.channels.setdefault(channel, []).insert(0, video_id)
+
+    @property
+    def live_target_duration(self) -> int:
+        """Duración de segmento anunciada, en segundos reales."""
+        return max(1, math.ceil(fixtures.SEGMENT_SECONDS / self.live_speed))
+
+    def live_segments_available(self, video_id: str) -> int:
+        """Segmentos publicados del directo; el reloj empieza en la primera petición."""
+        with self._lock:
+            started = self._live_started.setdefault(video_id, time.monotonic())
+        elapsed = (time.monotonic() - started) * self.live_speed
+        return 1 + int(elapsed // fixtures.SEGMENT_SECONDS)
+
+    def start(self) -> "YouTubeStandIn":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in local de YouTube")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Segundos añadidos por respuesta")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probabilidad de error inyectado")
+    parser.add_argument("--live-speed", type=float, default=60.0,
+                        help="Segundos de directo simulado por segundo real")
+    args = parser.parse_args()
+
+    standin = YouTubeStandIn(args.host, args.port, args.latency, args.failure_rate,
+                             live_speed=args.live_speed)
+    print(f"🎭 Stand-in de YouTube escuchando en {standin.base_url}")
+    print(f"   Ejemplo de video: {fixtures.fixture_video_id('ttml', 10)}")
+    print(f"   Ejemplo de directo: {fixtures.fixture_video_id(fixtures.LIVE_FORMAT, 10)}")
+    print("   Canal para la precarga: https://www.youtube.com/@fixtures/videos")
+    try:
+        standin._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        standin._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
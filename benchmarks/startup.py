@@ -0,0 +1,134 @@
+"""
+Benchmark del tiempo de arranque.
+
+Cada medición se hace en un intérprete nuevo para incluir el coste real de
+los imports:
+- import de youtube_processor y de main
+- inicialización de yt-dlp con todos los extractores frente a solo YouTube
+- warm-up completo (youtube_processor.warm_up)
+- tiempo hasta que /health responde con `python main.py`
+
+Uso:
+    python -m benchmarks.startup --repeat 5
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime
+
+from benchmarks.bench import RESULTS_DIR, _git_commit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_SNIPPETS = {
+    "import_youtube_processor": "import youtube_processor",
+    "import_main": "import main",
+    "ydl_init_all_extractors": (
+        "import yt_dlp\n"
+        "yt_dlp.YoutubeDL({'quiet': True})"
+    ),
+    "ydl_init_youtube_only": (
+        "import youtube_processor\n"
+        "yt_dlp, YoutubeIE = youtube_processor.load_yt_dlp()\n"
+        "yt_dlp.YoutubeDL({'quiet': True}, auto_init=False).add_info_extractor(YoutubeIE())"
+    ),
+    "warm_up": "import youtube_processor\nyoutube_processor.warm_up()",
+}
+
+
+def _time_snippet(code: str) -> float:
+    """Ejecuta el fragmento en un intérprete nuevo y devuelve sus segundos."""
+    wrapper = (
+        "import time, sys\n"
+        "start = time.perf_counter()\n"
+        f"{code}\n"
+        "sys.stderr.write(repr(time.perf_counter() - start))\n"
+    )
+    env = {**os.environ, "LOG_LEVEL": "WARNING"}
+    proc = subprocess.run(
+        [sys.executable, "-c", wrapper], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True,
+    )
+    return float(proc.stderr.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _time_health_ready(timeout: float = 30.0) -> float:
+    """Segundos desde lanzar `python main.py` hasta el primer 200 en /health."""
+    port = _free_port()
+    env = {**os.environ, "PORT": str(port), "HOST": "127.0.0.1", "WEB_CONCURRENCY": "1", "LOG_LEVEL": "WARNING"}
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "main.py"], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.02)
+        raise TimeoutError("/health no respondió a tiempo")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def run(repeat: int) -> dict:
+    results = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "cases": {},
+    }
+    measures = {name: (lambda code=code: _time_snippet(code)) for name, code in _SNIPPETS.items()}
+    measures["health_ready"] = _time_health_ready
+
+    for name, measure in measures.items():
+        print(f"⏱️  {name}...", file=sys.stderr)
+        durations = [measure() for _ in range(repeat)]
+        results["cases"][name] = {
+            "seconds_min": min(durations),
+            "seconds_median": statistics.median(durations),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del tiempo de arranque")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Ruta del JSON de resultados")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    for name, data in results["cases"].items():
+        print(f"  {name:26} min {data['seconds_min'] * 1000:8.1f} ms  mediana {data['seconds_median'] * 1000:8.1f} ms")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"startup_{datetime.now():%Y%m%d-%H%M%S}_{results['commit']}.json"
+    )
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Resultados guardados en {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Benchmark de la escritura del archivo generado.
+
+Descarga y parsea una vez la fixture (por defecto la de 10 horas) y después
+ejecuta process_video con la transcripción ya en memoria, de modo que solo
+se mide lo que ocurre a partir de tener los fragmentos: construcción del
+prompt, escritura (txt y json), almacenamiento e indexación.
+
+Se publica:
+- pico de memoria de process_video por encima de la transcripción (tracemalloc)
+- duración de la etapa `write` y del tramo completo tras la extracción
+- pico de memoria y duración del escritor por sí solo (artifact_writer)
+- lo mismo para la escritura anterior a artifact_writer (`legacy`: prompt
+  completo con ' '.join + f-string y json.dump con indent=2), para comparar
+  antes y después en la misma ejecución
+
+Uso:
+    python -m benchmarks.writer
+    python -m benchmarks.writer --fixture ttml0060min --repeat 5
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks import fixtures
+from benchmarks.bench import RESULTS_DIR, _git_commit
+from benchmarks.standin import YouTubeStandIn
+
+DEFAULT_FIXTURE = fixtures.fixture_video_id("ttml", fixtures.SIZES["10h"])
+
+
+def _run_once(processor, video_id: str, file_id: str, output_format: str) -> dict:
+    from metrics import collect_stage_timings
+
+    with collect_stage_timings() as timings:
+        start = time.perf_counter()
+        result = processor.process_video(video_id, file_id, output_format)
+        total = time.perf_counter() - start
+    if not result["success"]:
+        raise RuntimeError(result["message"])
+    stages = {}
+    for stage, _, elapsed in timings:
+        stages[stage] = stages.get(stage, 0.0) + elapsed
+    return {"total": total, "stages": stages, "path": result["file_path"]}
+
+
+def bench_format(processor, video_id: str, output_format: str, repeat: int) -> dict:
+    write_durations = []
+    total_durations = []
+    for i in range(repeat):
+        run = _run_once(processor, video_id, f"writer-{output_format}-{i}", output_format)
+        write_durations.append(run["stages"].get("write", 0.0))
+        total_durations.append(run["total"])
+        size = os.path.getsize(run["path"])
+
+    tracemalloc.start()
+    _run_once(processor, video_id, f"writer-{output_format}-mem", output_format)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "artifact_bytes": size,
+        "write_seconds_min": min(write_durations),
+        "write_seconds_median": statistics.median(write_durations),
+        "post_extraction_seconds_min": min(total_durations),
+        "peak_memory_bytes": peak,
+    }
+
+
+def _write_legacy(fragments, output_format: str, path: str):
+    """Escritura tal como la hacía process_video antes de artifact_writer."""
+    from artifact_writer import PROMPT_HEADER
+
+    transcript_text = ' '.join(fragments)
+    prompt = f"""{PROMPT_HEADER}{transcript_text}"""
+    output_data = {
+        "video_id": "bench",
+        "url": "bench",
+        "processed_at": "bench",
+        "transcript_length": len(transcript_text),
+        "prompt": prompt,
+        "transcript_lines": len(fragments),
+        "file_id": "bench",
+    }
+    if output_format == "json":
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(output_data, f, ensure_ascii=False, indent=2)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(prompt)
+
+
+def bench_writer(fragments, output_format: str, path: str, repeat: int, legacy: bool = False) -> dict:
+    """Escritor aislado: sin almacenamiento ni índice."""
+    from artifact_writer import transcript_length, write_json, write_txt
+
+    def write():
+        if legacy:
+            _write_legacy(fragments, output_format, path)
+        elif output_format == "json":
+            head = {"video_id": "bench", "url": "bench", "processed_at": "bench",
+                    "transcript_length": transcript_length(fragments)}
+            write_json(path, head, fragments, {"transcript_lines": len(fragments), "file_id": "bench"})
+        else:
+            write_txt(path, fragments)
+
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        write()
+        durations.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    write()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds_min": min(durations), "peak_memory_bytes": peak}
+
+
+def run(video_id: str, repeat: int) -> dict:
+    from search_index import SearchIndex
+    from storage import LocalStorage
+    from store import SharedStore
+    from youtube_processor import YouTubeProcessor
+
+    results = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "fixture": video_id,
+        "repeat": repeat,
+        "formats": {},
+    }
+
+    with YouTubeStandIn() as standin, tempfile.TemporaryDirectory() as output_dir:
+        os.environ["YOUTUBE_STANDIN_URL"] = standin.base_url
+        processor = YouTubeProcessor(
+            store=SharedStore(os.path.join(output_dir, "store.db")),
+            storage=LocalStorage(output_dir),
+            search_index=SearchIndex(os.path.join(output_dir, "search.db")),
+        )
+        processor.output_dir = output_dir
+        processor.cache_ttl = 0
+
+        # La transcripción se obtiene una sola vez: el benchmark empieza después
+        cues, error = processor.obtener_fragmentos(video_id)
+        if not cues:
+            raise RuntimeError(error)
+        processor.obtener_fragmentos = lambda _video_id: (cues, None)
+        results["transcript_fragments"] = len(cues["fragments"])
+        results["transcript_characters"] = sum(len(f) for f in cues["fragments"])
+
+        for output_format in ("txt", "json"):
+            print(f"⏱️  {video_id} {output_format}...", file=sys.stderr)
+            results["formats"][output_format] = bench_format(processor, video_id, output_format, repeat)
+            path = os.path.join(output_dir, f"writer.{output_format}")
+            results["formats"][output_format]["writer_only"] = bench_writer(
+                cues["fragments"], output_format, path, repeat * 5
+            )
+            results["formats"][output_format]["writer_legacy"] = bench_writer(
+                cues["fragments"], output_format, path, repeat * 5, legacy=True
+            )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la escritura del archivo generado")
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE, help="video_id de la fixture")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Ruta del JSON de resultados")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    results = run(args.fixture, args.repeat)
+    for output_format, data in results["formats"].items():
+        print(
+            f"  {output_format:4} write {data['write_seconds_min'] * 1000:8.1f} ms  "
+            f"post-extracción {data['post_extraction_seconds_min'] * 1000:8.1f} ms  "
+            f"pico {data['peak_memory_bytes'] / 1_000_000:7.1f} MB  "
+            f"archivo {data['artifact_bytes'] / 1_000_000:6.1f} MB"
+        )
+        for label, key in (("escritor", "writer_only"), ("legacy  ", "writer_legacy")):
+            writer = data[key]
+            print(
+                f"       {label} {writer['seconds_min'] * 1000:8.1f} ms  "
+                f"pico {writer['peak_memory_bytes'] / 1_000_000:7.2f} MB"
+            )
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"writer_{datetime.now():%Y%m%d-%H%M%S}_{results['commit']}.json"
+    )
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Resultados guardados en {output}")
+
+
+if __name__ == "__main__":
+    main()
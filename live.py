@@ -0,0 +1,319 @@
+"""
+Transcripción incremental de directos.
+
+Un directo no se procesa de una vez: un poller vuelve a pedir la playlist
+M3U8 de subtítulos cada EXT-X-TARGETDURATION segundos, descarga solo los
+segmentos con número de secuencia nuevo y los añade al final del archivo
+TXT. Los clientes leen el texto nuevo desde un cursor (offset en bytes del
+archivo), así un directo largo nunca se reprocesa desde el principio.
+
+El estado de cada sesión vive en el almacén compartido. El poller renueva
+un lease en cada vuelta; si el worker que lo ejecutaba muere, cualquier
+otro lo retoma desde el último segmento confirmado.
+
+Mientras la sesión sigue abierta el archivo se llama `live_{file_id}.txt`:
+no es un resultado terminado, así que ni el registro de archivos al arrancar
+ni la caché de lectura de S3 lo tocan. Al cerrarse se renombra a
+`output_{file_id}.txt` y se publica como cualquier otro.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+from artifact_writer import PROMPT_HEADER, append_txt, write_txt
+from logging_config import bind_request_id
+from metrics import IN_FLIGHT, track_stage
+from youtube_processor import YouTubeProcessor, http_session
+
+logger = logging.getLogger(__name__)
+
+# Intervalo entre consultas de la playlist (0: el EXT-X-TARGETDURATION del directo)
+LIVE_POLL_INTERVAL = float(os.getenv("LIVE_POLL_INTERVAL", 0))
+# Tiempo sin renovar el lease tras el que otro worker retoma la sesión
+LIVE_LEASE_TTL = float(os.getenv("LIVE_LEASE_TTL", 60))
+# Fallos seguidos de la playlist antes de dar la sesión por terminada con error
+LIVE_MAX_ERRORS = int(os.getenv("LIVE_MAX_ERRORS", 5))
+
+DEFAULT_TARGET_DURATION = 5.0
+HEADER_SIZE = len(PROMPT_HEADER.encode("utf-8"))
+
+
+def parse_playlist(content: str, base_url: str) -> Dict:
+    """
+    Extrae de una playlist M3U8 los segmentos como (secuencia, url), la
+    duración objetivo y si el directo terminó (EXT-X-ENDLIST).
+    """
+    sequence = 0
+    target_duration = None
+    ended = False
+    segments = []
+    for line in content.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("#EXT-X-MEDIA-SEQUENCE:"):
+            sequence = int(line.split(":", 1)[1])
+        elif line.startswith("#EXT-X-TARGETDURATION:"):
+            target_duration = float(line.split(":", 1)[1])
+        elif line.startswith("#EXT-X-ENDLIST"):
+            ended = True
+        elif not line.startswith("#"):
+            segments.append((sequence + len(segments), urljoin(base_url, line)))
+    return {"segments": segments, "target_duration": target_duration, "ended": ended}
+
+
+class LiveTranscriber:
+    """Arranca, retoma y detiene los pollers de los directos de este worker."""
+
+    def __init__(self, processor: Optional[YouTubeProcessor] = None):
+        self.processor = processor if processor is not None else YouTubeProcessor()
+        self.store = self.processor.store
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+
+    def _new_owner(self) -> str:
+        """Identificador único de cada poller, aunque corran en el mismo worker."""
+        return f"{self.worker}:{uuid.uuid4().hex[:8]}"
+
+    def _path(self, file_id: str) -> str:
+        """Archivo de la sesión mientras sigue abierta."""
+        return os.path.join(self.processor.output_dir, f"live_{file_id}.txt")
+
+    def _artifact_path(self, file_id: str) -> str:
+        return os.path.join(self.processor.output_dir, f"output_{file_id}.txt")
+
+    def start(self, video_id: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        Inicia la transcripción del directo, o devuelve la sesión en curso si
+        ya existe una para el mismo video. Devuelve (sesión, None) o
+        (None, mensaje de error).
+        """
+        existing = self.store.live_find_running(video_id)
+        if existing is not None:
+            self.ensure_running(existing["file_id"])
+            return existing, None
+
+        info = self.processor.obtener_info(video_id)
+        if info is None:
+            return None, "No se pudo obtener la información del video."
+        if not info.get("is_live"):
+            return None, "El video no es un directo en curso; usa /process."
+        playlist_url = self.processor.seleccionar_subtitulos(info, solo_m3u8=True)
+        if playlist_url is None:
+            return None, "El directo no tiene subtítulos M3U8 disponibles."
+
+        file_id = str(uuid.uuid4())
+        owner = self._new_owner()
+        write_txt(self._path(file_id), [])
+        session = self.store.live_create(file_id, video_id, playlist_url, HEADER_SIZE, owner, LIVE_LEASE_TTL)
+        if session["file_id"] != file_id:
+            # Otra petición inició el mismo directo mientras se consultaba el video
+            os.remove(self._path(file_id))
+            self.ensure_running(session["file_id"])
+            return session, None
+        self._spawn(file_id, owner)
+        logger.info("🔴 Directo %s: transcripción iniciada", video_id,
+                    extra={"video_id": video_id, "file_id": file_id})
+        return self.store.live_get(file_id), None
+
+    def stop(self, file_id: str) -> Optional[Dict]:
+        """Pide al poller que cierre la sesión; la cierra aquí si no hay poller vivo."""
+        session = self.store.live_get(file_id)
+        if session is None:
+            return None
+        if self.store.live_request_stop(file_id):
+            self.ensure_running(file_id)
+        return self.store.live_get(file_id)
+
+    def ensure_running(self, file_id: str):
+        """Retoma la sesión si su poller dejó de renovar el lease."""
+        owner = self._new_owner()
+        session = self.store.live_claim(file_id, owner, LIVE_LEASE_TTL)
+        if session is None:
+            return
+        path = self._path(file_id)
+        legacy_path = self._artifact_path(file_id)
+        if not os.path.exists(path) and os.path.exists(legacy_path):
+            # Sesión iniciada con el nombre anterior (output_*) aún sin cerrar
+            os.replace(legacy_path, path)
+        # Lo escrito después del último tamaño confirmado se vuelve a descargar
+        if os.path.exists(path) and os.path.getsize(path) > session["size"]:
+            os.truncate(path, session["size"])
+        logger.info("♻️  Directo %s: poller retomado", session["video_id"], extra={"file_id": file_id})
+        self._spawn(file_id, owner)
+
+    def resume_orphans(self) -> int:
+        orphans = self.store.live_orphans()
+        for file_id in orphans:
+            self.ensure_running(file_id)
+        return len(orphans)
+
+    def _spawn(self, file_id: str, owner: str):
+        threading.Thread(
+            target=self._run, args=(file_id, owner), name=f"live-{file_id[:8]}", daemon=True
+        ).start()
+
+    def read(self, file_id: str, cursor: int) -> Optional[Dict]:
+        """
+        Texto añadido desde `cursor` hasta el último tamaño confirmado. Retoma
+        la sesión si su lease expiró. Lanza ValueError si el cursor está fuera del archivo.
+        """
+        session = self.store.live_get(file_id)
+        if session is None:
+            return None
+        if session["state"] in ("running", "stopping") and session["lease_expires"] <= time.time():
+            # El worker que hacía el polling murió: este lo retoma. Con el
+            # lease vigente la lectura no escribe en el almacén
+            self.ensure_running(file_id)
+        size = session["size"]
+        if cursor < 0 or cursor > size:
+            raise ValueError(f"cursor fuera de rango (0-{size})")
+
+        data = b""
+        if cursor < size:
+            try:
+                with open(self._path(file_id), "rb") as f:
+                    f.seek(cursor)
+                    data = f.read(size - cursor)
+            except FileNotFoundError:
+                # Sesión cerrada: el archivo ya está publicado en el almacenamiento
+                artifact = self.store.get_artifact(file_id)
+                if artifact is not None:
+                    stream = self.processor.storage.open_stream(
+                        artifact["filename"], f"bytes={cursor}-{size - 1}"
+                    )
+                    data = b"".join(stream["chunks"]) if stream else b""
+        return {
+            "file_id": file_id,
+            "video_id": session["video_id"],
+            "state": session["state"],
+            "error": session["error"],
+            "cursor": size,
+            "text": data.decode("utf-8"),
+        }
+
+    def _run(self, file_id: str, owner: str):
+        # El hilo no hereda el contexto de la petición: se correlaciona por sesión
+        with bind_request_id(file_id), IN_FLIGHT.labels(operation="live_session").track_inprogress():
+            try:
+                self._poll(file_id, owner)
+            except Exception as e:
+                logger.exception("❌ Error en el poller del directo: %s", e, extra={"file_id": file_id})
+                session = self.store.live_get(file_id)
+                if session is not None and session["owner"] == owner:
+                    self._finalize(session, "error", str(e))
+
+    def _poll(self, file_id: str, owner: str):
+        session = self.store.live_get(file_id)
+        path = self._path(file_id)
+        next_sequence = session["next_sequence"]
+        size = session["size"]
+        errors = 0
+
+        while True:
+            session = self.store.live_get(file_id)
+            if session is None or session["owner"] != owner or session["state"] not in ("running", "stopping"):
+                return
+            if session["state"] == "stopping":
+                self._finalize(session, "stopped")
+                return
+
+            try:
+                with track_stage("live_playlist"):
+                    resp = http_session.get(session["playlist_url"])
+                    resp.raise_for_status()
+                playlist = parse_playlist(resp.text, session["playlist_url"])
+                errors = 0
+            except Exception as e:
+                errors += 1
+                logger.warning("⚠️  Error consultando la playlist del directo (%d/%d): %s",
+                               errors, LIVE_MAX_ERRORS, e, extra={"file_id": file_id})
+                if errors >= LIVE_MAX_ERRORS:
+                    self._finalize(session, "error", str(e))
+                    return
+                if not self.store.live_update(file_id, owner, next_sequence, size, LIVE_LEASE_TTL):
+                    return
+                time.sleep(LIVE_POLL_INTERVAL or DEFAULT_TARGET_DURATION)
+                continue
+
+            segments = playlist["segments"]
+            if segments and segments[0][0] > next_sequence:
+                # La ventana de la playlist avanzó más que nuestro intervalo
+                logger.warning("⚠️  Directo: %d segmentos ya no están en la playlist",
+                               segments[0][0] - next_sequence, extra={"file_id": file_id})
+
+            lines: List[str] = []
+            for sequence, url in segments:
+                if sequence < next_sequence:
+                    continue
+                try:
+                    lines.extend(self.processor.descargar_segmento(url))
+                except Exception as e:
+                    # Se reintenta en la siguiente vuelta para no desordenar el texto
+                    logger.warning("⚠️  Error descargando segmento %d: %s", sequence, e,
+                                   extra={"file_id": file_id})
+                    break
+                next_sequence = sequence + 1
+
+            if lines:
+                fragments = self.processor.extraer_texto_de_p(lines)
+                if fragments:
+                    size = append_txt(path, fragments, continuation=size > HEADER_SIZE)
+
+            if not self.store.live_update(file_id, owner, next_sequence, size, LIVE_LEASE_TTL):
+                logger.warning("⚠️  Directo: otro worker tomó la sesión", extra={"file_id": file_id})
+                return
+
+            if playlist["ended"] and (not segments or next_sequence > segments[-1][0]):
+                self._finalize(self.store.live_get(file_id), "finished")
+                return
+
+            time.sleep(LIVE_POLL_INTERVAL or playlist["target_duration"] or DEFAULT_TARGET_DURATION)
+
+    def _finalize(self, session: Dict, state: str, error: Optional[str] = None):
+        """Cierra la sesión y publica el archivo como cualquier otro resultado."""
+        file_id = session["file_id"]
+        path = self._path(file_id)
+        size = session["size"]
+
+        if size > HEADER_SIZE and os.path.exists(path):
+            os.truncate(path, size)
+            with open(path, "rb") as f:
+                f.seek(HEADER_SIZE)
+                body = f.read().decode("utf-8")
+            # Ya es un resultado terminado: recibe el nombre de los demás archivos
+            output_file = self._artifact_path(file_id)
+            os.replace(path, output_file)
+            filename = os.path.basename(output_file)
+            etag = self.processor.storage.save(filename, output_file)
+            self.store.register_artifact(file_id, filename, size, session["video_id"], etag=etag)
+            try:
+                self.processor.search_index.add(file_id, session["video_id"], [body])
+            except Exception as e:
+                logger.warning("⚠️ No se pudo indexar %s: %s", file_id, e, extra={"file_id": file_id})
+        elif os.path.exists(path):
+            # Sin texto no hay archivo que publicar
+            os.remove(path)
+
+        self.store.live_finish(file_id, state, error)
+        logger.info("⏹️  Directo %s: sesión cerrada (%s)", session["video_id"], state,
+                    extra={"video_id": session["video_id"], "file_id": file_id})
+
+
+_transcriber = None
+_transcriber_lock = threading.Lock()
+
+
+def get_live_transcriber() -> LiveTranscriber:
+    """Instancia compartida para este proceso."""
+    global _transcriber
+    if _transcriber is None:
+        with _transcriber_lock:
+            if _transcriber is None:
+                _transcriber = LiveTranscriber()
+    return _transcriber
@@ -0,0 +1,106 @@
+"""
+Logging estructurado en JSON para la API y el procesador de YouTube.
+
+Los registros se encolan en el hilo que los emite (QueueHandler) y un hilo de
+fondo (QueueListener) los formatea y escribe, así las peticiones nunca se
+bloquean escribiendo en stdout. Cada registro lleva el id de correlación de la
+petición o tarea en curso.
+"""
+
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Id de correlación de la petición o tarea en curso
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+# Atributos estándar de LogRecord que no se copian como campos extra
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+_listener = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Adjunta el id de correlación al registro en el hilo que lo emite."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Encola el registro sin formatearlo. El QueueHandler estándar lo formatea en
+    el hilo que lo emite y borra `exc_info`, con lo que la traza acabaría
+    pegada a "message" en lugar de en su propio campo.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return copy.copy(record)
+
+
+class JSONFormatter(logging.Formatter):
+    """Formatea cada registro como una línea JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            payload["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def setup_logging(level: str = None):
+    """
+    Configura el logger raíz con un QueueHandler no bloqueante.
+    Es idempotente: llamadas repetidas no duplican handlers.
+    """
+    global _listener
+    root = logging.getLogger()
+    root.setLevel((level or os.getenv("LOG_LEVEL", "INFO")).upper())
+
+    if _listener is not None:
+        return
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JSONFormatter())
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root.handlers = [queue_handler]
+
+
+@contextmanager
+def bind_request_id(request_id: str):
+    """
+    Asocia un id de correlación a todos los registros emitidos dentro del bloque.
+    """
+    token = request_id_var.set(request_id)
+    try:
+        yield
+    finally:
+        request_id_var.reset(token)
@@ -1,19 +1,60 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Header, Request, status
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, HttpUrl
 import secrets
 import os
 from typing import Optional
 import uvicorn
-from youtube_processor import YouTubeProcessor
+from youtube_processor import INFLIGHT_TTL, YouTubeProcessor, warm_up
+from metrics import CACHE_REQUESTS, IN_FLIGHT, collect_stage_timings, format_server_timing, render_latest
+from logging_config import bind_request_id, setup_logging
+from live import HEADER_SIZE as LIVE_HEADER_SIZE, get_live_transcriber
+from prefetch import start_prefetch
+from search_index import get_search_index
+from store import get_store
+from storage import RangeNotSatisfiable, get_storage
 import uuid
+import time
+import json
+import asyncio
+import hashlib
+import math
+import shutil
+import logging
+import tempfile
+import threading
+from contextlib import asynccontextmanager
 from datetime import datetime
 
+setup_logging()
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Inicialización de cada worker"""
+    os.makedirs("outputs", exist_ok=True)
+    # Indexar archivos generados antes de que existiera el almacén compartido
+    added = get_store().sync_artifacts("outputs")
+    if added:
+        logger.info("🗂️  Indexados %d archivos existentes", added)
+    # Retomar los directos cuyo worker anterior se detuvo
+    if get_store().live_orphans():
+        resumed = get_live_transcriber().resume_orphans()
+        logger.info("🔴 Retomados %d directos", resumed)
+    # El warm-up corre en segundo plano para no retrasar /health
+    if os.getenv("WARMUP", "true").lower() == "true":
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    # Precarga de la watch-list (PREFETCH_WATCHLIST)
+    start_prefetch()
+    yield
+
 app = FastAPI(
     title="YouTube Summary API",
     description="API para generar resúmenes de videos de YouTube",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 security = HTTPBasic()
@@ -22,6 +63,12 @@ security = HTTPBasic()
 USERNAME = os.getenv("API_USERNAME", "admin")
 PASSWORD = os.getenv("API_PASSWORD", "password123")
 
+# Tiempo que se conserva la respuesta asociada a un Idempotency-Key
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", 24 * 3600))
+# Tiempo máximo que un reintento espera a la petición original en curso
+IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", INFLIGHT_TTL))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
 class YouTubeRequest(BaseModel):
     url: str
     output_format: Optional[str] = "txt"  # txt o json
@@ -32,6 +79,26 @@ class YouTubeResponse(BaseModel):
     file_id: Optional[str] = None
     video_id: Optional[str] = None
     download_url: Optional[str] = None
+    profile_path: Optional[str] = None
+
+class LiveRequest(BaseModel):
+    url: str
+
+class LiveResponse(BaseModel):
+    file_id: str
+    video_id: str
+    state: str
+    cursor: int
+    live_url: str
+
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """Asigna un id de correlación a la petición y lo devuelve en X-Request-ID"""
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    with bind_request_id(request_id):
+        response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
 
 def authenticate_user(credentials: HTTPBasicCredentials = Depends(security)):
     """Autentica al usuario usando HTTP Basic Auth"""
@@ -56,7 +123,10 @@ async def root():
         "endpoints": {
             "process": "/process",
             "download": "/download/{file_id}",
-            "health": "/health"
+            "search": "/search",
+            "live": "/live",
+            "health": "/health",
+            "metrics": "/metrics"
         }
     }
 
@@ -65,14 +135,150 @@ async def health_check():
     """Endpoint de verificación de salud"""
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
+@app.get("/metrics")
+async def metrics():
+    """Exposición de métricas en formato Prometheus"""
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
+
 @app.post("/process", response_model=YouTubeResponse)
 async def process_youtube_video(
     request: YouTubeRequest,
+    response: Response,
+    debug: Optional[str] = None,
+    idempotency_key: Optional[str] = Header(None),
     username: str = Depends(authenticate_user)
 ):
     """
-    Procesa un video de YouTube y genera el archivo de resumen
+    Procesa un video de YouTube y genera el archivo de resumen.
+    Con `?debug=profile` la petición se ejecuta bajo un profiler de muestreo
+    y el perfil se guarda en outputs/ junto al archivo generado.
+    Con la cabecera `Idempotency-Key` los reintentos de la misma petición
+    devuelven el resultado ya generado o esperan a la petición en curso.
+    """
+    if debug not in (None, "profile"):
+        raise HTTPException(
+            status_code=400,
+            detail="Valor de debug no soportado (usar 'profile')"
+        )
+
+    key = None
+    if idempotency_key is not None:
+        if not idempotency_key or len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Idempotency-Key debe tener entre 1 y {IDEMPOTENCY_KEY_MAX_LENGTH} caracteres"
+            )
+        # Las claves son por usuario: dos clientes no pueden pisarse
+        key = f"{username}:{idempotency_key}"
+        stored = await _claim_idempotency_key(key, _request_fingerprint(request))
+        if stored is not None:
+            response.headers["Idempotent-Replayed"] = "true"
+            return stored
+
+    start = time.perf_counter()
+    # La reserva caduca a los INFLIGHT_TTL segundos (por si el worker muere):
+    # mientras la petición siga viva se renueva para que un reintento no la duplique
+    renewal = asyncio.create_task(_renew_idempotency_key(key)) if key is not None else None
+    with IN_FLIGHT.labels(operation="http_process").track_inprogress(), collect_stage_timings() as timings:
+        try:
+            # La extracción (y la espera a otro worker que ya la hace) corre en el
+            # threadpool para no congelar el event loop del worker
+            result = await run_in_threadpool(_process_youtube_video, request, debug == "profile")
+        except HTTPException as e:
+            if key is not None:
+                # Un fallo no se memoriza: el reintento vuelve a intentarlo
+                get_store().idempotency_release(key)
+            server_timing = format_server_timing(timings, time.perf_counter() - start)
+            e.headers = {**(e.headers or {}), "Server-Timing": server_timing}
+            raise
+        except BaseException:
+            if key is not None:
+                get_store().idempotency_release(key)
+            raise
+        finally:
+            if renewal is not None:
+                renewal.cancel()
+    if key is not None:
+        get_store().idempotency_finish(key, result.model_dump(), IDEMPOTENCY_TTL)
+    response.headers["Server-Timing"] = format_server_timing(timings, time.perf_counter() - start)
+    return result
+
+def _request_fingerprint(request: YouTubeRequest) -> str:
+    """Huella del cuerpo para detectar una clave reutilizada con otra petición"""
+    body = json.dumps(request.model_dump(), sort_keys=True)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+async def _claim_idempotency_key(key: str, fingerprint: str) -> Optional[dict]:
+    """
+    Reserva la clave para esta petición (devuelve None) o devuelve la
+    respuesta guardada. Si la petición original sigue en curso, espera a
+    que termine sin bloquear el event loop.
     """
+    store = get_store()
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT
+    waited = False
+    while True:
+        entry = store.idempotency_begin(key, fingerprint, INFLIGHT_TTL)
+        if entry is None:
+            CACHE_REQUESTS.labels(cache="idempotency", result="miss").inc()
+            return None
+        if entry["fingerprint"] != fingerprint:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key ya usada con una petición distinta"
+            )
+        if entry["state"] == "done":
+            result = entry["result"]
+            if await run_in_threadpool(find_artifact, result["file_id"]) is None:
+                # El archivo se eliminó: la clave ya no apunta a nada útil
+                store.idempotency_release(key)
+                continue
+            CACHE_REQUESTS.labels(cache="idempotency", result="dedup" if waited else "hit").inc()
+            logger.info("🔁 Idempotency-Key repetida, se devuelve %s", result["file_id"],
+                        extra={"file_id": result["file_id"]})
+            return result
+        if time.monotonic() >= deadline:
+            raise HTTPException(
+                status_code=409,
+                detail="La petición con esta Idempotency-Key sigue en curso",
+                headers={"Retry-After": "5"}
+            )
+        waited = True
+        await asyncio.sleep(0.2)
+
+async def _renew_idempotency_key(key: str):
+    """Renueva la reserva de la clave mientras la petición original sigue en curso."""
+    while True:
+        await asyncio.sleep(INFLIGHT_TTL / 3)
+        get_store().idempotency_renew(key, INFLIGHT_TTL)
+
+def _run_profiled(file_id: str, func, *args):
+    """
+    Ejecuta func bajo pyinstrument y guarda el perfil HTML en outputs/.
+    Devuelve (resultado, ruta del perfil).
+    """
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        raise HTTPException(
+            status_code=400,
+            detail="El modo profile requiere pyinstrument instalado"
+        )
+
+    profiler = Profiler(interval=0.001, async_mode="disabled")
+    profiler.start()
+    try:
+        result = func(*args)
+    finally:
+        profiler.stop()
+        profile_path = os.path.join("outputs", f"profile_{file_id}.html")
+        with open(profile_path, "w", encoding="utf-8") as f:
+            f.write(profiler.output_html())
+        logger.info("🧪 Perfil guardado: %s", profile_path, extra={"file_id": file_id})
+    return result, profile_path
+
+def _process_youtube_video(request: YouTubeRequest, profile: bool = False) -> YouTubeResponse:
     try:
         # Inicializar el procesador
         processor = YouTubeProcessor()
@@ -89,7 +295,13 @@ async def process_youtube_video(
         file_id = str(uuid.uuid4())
         
         # Procesar el video
-        result = processor.process_video(video_id, file_id, request.output_format)
+        profile_path = None
+        if profile:
+            result, profile_path = _run_profiled(
+                file_id, processor.process_video, video_id, file_id, request.output_format
+            )
+        else:
+            result = processor.process_video(video_id, file_id, request.output_format)
         
         if not result["success"]:
             error_message = result["message"]
@@ -140,7 +352,8 @@ async def process_youtube_video(
             message="Video procesado exitosamente",
             file_id=file_id,
             video_id=video_id,
-            download_url=f"/download/{file_id}"
+            download_url=f"/download/{file_id}",
+            profile_path=profile_path
         )
         
     except HTTPException:
@@ -151,36 +364,147 @@ async def process_youtube_video(
             detail=f"Error interno del servidor: {str(e)}"
         )
 
+# Los archivos generados son inmutables: pueden cachearse indefinidamente
+ARTIFACT_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+MEDIA_TYPES = {
+    ".txt": "text/plain",
+    ".json": "application/json",
+}
+
+class ArtifactFileResponse(FileResponse):
+    """
+    FileResponse que usa la extensión ASGI `http.response.pathsend` cuando el
+    servidor la ofrece, para que el kernel envíe el archivo (sendfile) sin
+    copiarlo por Python. Si no, Starlette lo envía por bloques; las peticiones
+    Range (206) siempre usan la ruta por bloques de Starlette.
+    """
+
+    chunk_size = 256 * 1024
+
+    async def __call__(self, scope, receive, send):
+        self._pathsend = "http.response.pathsend" in scope.get("extensions", {})
+        await super().__call__(scope, receive, send)
+
+    async def _handle_simple(self, send, send_header_only: bool) -> None:
+        if self._pathsend and not send_header_only:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            await send({"type": "http.response.pathsend", "path": self.path})
+            return
+        await super()._handle_simple(send, send_header_only)
+
+def artifact_etag(stat_result: os.stat_result) -> str:
+    """ETag fuerte derivado del tamaño y la fecha de modificación del archivo"""
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110, 13.1.2)"""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+def find_artifact(file_id: str) -> Optional[dict]:
+    """
+    Metadatos del archivo generado. Con almacenamiento remoto se consultan al
+    propio backend (otra réplica pudo generarlo o borrarlo); con el local, el
+    índice del almacén está junto a los archivos.
+    """
+    storage = get_storage()
+    if storage.name == "local":
+        return get_store().get_artifact(file_id)
+    return storage.find_artifact(file_id)
+
 @app.get("/download/{file_id}")
 async def download_file(
     file_id: str,
+    request: Request,
     username: str = Depends(authenticate_user)
 ):
     """
-    Descarga el archivo generado por su ID
+    Descarga el archivo generado por su ID.
+    Soporta validación con ETag (If-None-Match -> 304) y descargas parciales (Range).
     """
     try:
-        # Verificar que el archivo existe
-        txt_file = f"outputs/output_{file_id}.txt"
-        json_file = f"outputs/output_{file_id}.json"
-        
-        if os.path.exists(txt_file):
-            return FileResponse(
-                path=txt_file,
-                filename=f"youtube_summary_{file_id}.txt",
-                media_type="text/plain"
+        # Nombre real y ETag del backend (llamada remota con S3: fuera del event loop)
+        artifact = await run_in_threadpool(find_artifact, file_id)
+        if artifact is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Archivo no encontrado"
             )
-        elif os.path.exists(json_file):
-            return FileResponse(
-                path=json_file,
-                filename=f"youtube_summary_{file_id}.json",
-                media_type="application/json"
+
+        storage = get_storage()
+        filename = artifact["filename"]
+        extension = os.path.splitext(filename)[1]
+        media_type = MEDIA_TYPES.get(extension, "application/octet-stream")
+        download_name = f"youtube_summary_{file_id}{extension}"
+        if_none_match = request.headers.get("if-none-match")
+
+        # Disco local (backend local o caché de lectura): un solo stat
+        path = storage.local_path(filename)
+        stat_result = None
+        if path is not None:
+            try:
+                stat_result = os.stat(path)
+            except FileNotFoundError:
+                path = None
+
+        if path is not None:
+            etag = artifact["etag"] or artifact_etag(stat_result)
+            headers = {"ETag": etag, "Cache-Control": ARTIFACT_CACHE_CONTROL}
+            if if_none_match and etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers=headers)
+            return ArtifactFileResponse(
+                path=path,
+                filename=download_name,
+                media_type=media_type,
+                headers=headers,
+                stat_result=stat_result
             )
-        else:
+
+        if storage.name == "local":
             raise HTTPException(
                 status_code=404,
                 detail="Archivo no encontrado"
             )
+
+        # Almacenamiento remoto: lectura en streaming (Range se delega al backend)
+        headers = {"Cache-Control": ARTIFACT_CACHE_CONTROL, "Accept-Ranges": "bytes"}
+        if artifact["etag"]:
+            headers["ETag"] = artifact["etag"]
+            if if_none_match and etag_matches(if_none_match, artifact["etag"]):
+                return Response(status_code=304, headers=headers)
+
+        byte_range = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        if byte_range and if_range is not None and (not artifact["etag"] or if_range.strip() != artifact["etag"]):
+            # If-Range con un validador que ya no coincide: se envía el archivo completo
+            byte_range = None
+        try:
+            stream = await run_in_threadpool(storage.open_stream, filename, byte_range)
+        except RangeNotSatisfiable as e:
+            headers = {"Content-Range": f"bytes */{e.size}"} if e.size is not None else {}
+            raise HTTPException(
+                status_code=416,
+                detail="Rango no satisfacible",
+                headers=headers
+            )
+        if stream is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Archivo no encontrado"
+            )
+        headers["Content-Length"] = str(stream["size"])
+        headers["Content-Disposition"] = f'attachment; filename="{download_name}"'
+        if stream["content_range"]:
+            headers["Content-Range"] = stream["content_range"]
+        return StreamingResponse(
+            stream["chunks"],
+            status_code=stream["status"],
+            media_type=media_type,
+            headers=headers
+        )
             
     except HTTPException:
         raise
@@ -196,25 +520,22 @@ async def list_files(username: str = Depends(authenticate_user)):
     Lista todos los archivos generados
     """
     try:
-        if not os.path.exists("outputs"):
-            return {"files": []}
-        
+        # Con almacenamiento remoto se lista el bucket: incluye lo generado por otras réplicas
+        storage = get_storage()
+        if storage.name == "local":
+            artifacts = get_store().list_artifacts()
+        else:
+            artifacts = await run_in_threadpool(storage.list_artifacts)
         files = []
-        for filename in os.listdir("outputs"):
-            if filename.startswith("output_"):
-                file_path = os.path.join("outputs", filename)
-                file_stats = os.stat(file_path)
-                
-                # Extraer file_id del nombre del archivo
-                file_id = filename.replace("output_", "").replace(".txt", "").replace(".json", "")
-                
-                files.append({
-                    "file_id": file_id,
-                    "filename": filename,
-                    "size": file_stats.st_size,
-                    "created": datetime.fromtimestamp(file_stats.st_ctime).isoformat(),
-                    "download_url": f"/download/{file_id}"
-                })
+        for artifact in artifacts:
+            file_id = artifact["file_id"]
+            files.append({
+                "file_id": file_id,
+                "filename": artifact["filename"],
+                "size": artifact["size"],
+                "created": datetime.fromtimestamp(artifact["created_at"]).isoformat(),
+                "download_url": f"/download/{file_id}"
+            })
         
         return {"files": files}
         
@@ -224,6 +545,133 @@ async def list_files(username: str = Depends(authenticate_user)):
             detail=f"Error al listar archivos: {str(e)}"
         )
 
+# Espera máxima de GET /live/{file_id} cuando no hay texto nuevo
+LIVE_MAX_WAIT = 30.0
+
+@app.post("/live", response_model=LiveResponse)
+async def start_live(
+    request: LiveRequest,
+    username: str = Depends(authenticate_user)
+):
+    """
+    Inicia la transcripción incremental de un directo (o devuelve la sesión
+    en curso para el mismo video). El texto nuevo se lee con GET /live/{file_id}.
+    """
+    transcriber = get_live_transcriber()
+    video_id = transcriber.processor.extract_youtube_id(request.url)
+    if not video_id:
+        raise HTTPException(
+            status_code=400,
+            detail="URL de YouTube no válida"
+        )
+
+    # Consultar el video es una llamada a YouTube: fuera del event loop
+    session, error = await run_in_threadpool(transcriber.start, video_id)
+    if session is None:
+        raise HTTPException(
+            status_code=422,
+            detail=error
+        )
+    return LiveResponse(
+        file_id=session["file_id"],
+        video_id=session["video_id"],
+        state=session["state"],
+        # Las lecturas empiezan tras el encabezado del prompt
+        cursor=LIVE_HEADER_SIZE,
+        live_url=f"/live/{session['file_id']}"
+    )
+
+@app.get("/live/{file_id}")
+async def read_live(
+    file_id: str,
+    cursor: int = 0,
+    wait: float = 0,
+    username: str = Depends(authenticate_user)
+):
+    """
+    Devuelve el texto añadido al directo desde `cursor` y el cursor para la
+    siguiente lectura. Con `wait` (segundos, máx. 30) espera a que haya texto
+    nuevo si todavía no lo hay.
+    """
+    transcriber = get_live_transcriber()
+    deadline = time.monotonic() + min(max(wait, 0), LIVE_MAX_WAIT)
+    while True:
+        try:
+            delta = transcriber.read(file_id, cursor)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=400,
+                detail=str(e)
+            )
+        if delta is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Directo no encontrado"
+            )
+        if delta["text"] or delta["state"] not in ("running", "stopping") or time.monotonic() >= deadline:
+            break
+        await asyncio.sleep(0.5)
+
+    if delta["state"] in ("finished", "stopped") and get_store().get_artifact(file_id):
+        delta["download_url"] = f"/download/{file_id}"
+    return delta
+
+@app.delete("/live/{file_id}")
+async def stop_live(
+    file_id: str,
+    username: str = Depends(authenticate_user)
+):
+    """
+    Detiene la transcripción del directo. El texto acumulado queda como un
+    archivo más (descargable y buscable).
+    """
+    session = get_live_transcriber().stop(file_id)
+    if session is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Directo no encontrado"
+        )
+    return {"file_id": file_id, "state": session["state"]}
+
+# Máximo de resultados por página en /search
+SEARCH_MAX_LIMIT = 100
+
+@app.get("/search")
+async def search_transcripts(
+    q: str,
+    limit: int = 20,
+    offset: int = 0,
+    username: str = Depends(authenticate_user)
+):
+    """
+    Busca texto en todas las transcripciones generadas. Devuelve los archivos
+    ordenados por relevancia con un snippet y, cuando el formato de subtítulos
+    traía tiempos, el segundo del video de cada coincidencia.
+    """
+    if not q.strip():
+        raise HTTPException(
+            status_code=400,
+            detail="La consulta no puede estar vacía"
+        )
+    if limit < 1 or limit > SEARCH_MAX_LIMIT or offset < 0:
+        raise HTTPException(
+            status_code=400,
+            detail=f"limit debe estar entre 1 y {SEARCH_MAX_LIMIT} y offset no puede ser negativo"
+        )
+
+    try:
+        # La consulta SQLite corre en el threadpool: una búsqueda lenta no frena al resto
+        results = await run_in_threadpool(get_search_index().search, q, limit, offset)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error en la búsqueda: {str(e)}"
+        )
+
+    for result in results:
+        result["download_url"] = f"/download/{result['file_id']}"
+    return {"query": q, "limit": limit, "offset": offset, "results": results}
+
 @app.delete("/files/{file_id}")
 async def delete_file(
     file_id: str,
@@ -233,24 +681,21 @@ async def delete_file(
     Elimina un archivo por su ID
     """
     try:
-        txt_file = f"outputs/output_{file_id}.txt"
-        json_file = f"outputs/output_{file_id}.json"
-        
-        deleted = False
-        
-        if os.path.exists(txt_file):
-            os.remove(txt_file)
-            deleted = True
-            
-        if os.path.exists(json_file):
-            os.remove(json_file)
-            deleted = True
-        
-        if not deleted:
+        artifact = await run_in_threadpool(find_artifact, file_id)
+        if artifact is None:
             raise HTTPException(
                 status_code=404,
                 detail="Archivo no encontrado"
             )
+
+        await run_in_threadpool(get_storage().delete, artifact["filename"])
+        get_store().delete_artifact(file_id)
+        get_search_index().remove(file_id)
+
+        # Los perfiles de depuración siempre quedan en disco local
+        profile_file = f"outputs/profile_{file_id}.html"
+        if os.path.exists(profile_file):
+            os.remove(profile_file)
         
         return {"message": f"Archivo {file_id} eliminado exitosamente"}
         
@@ -262,6 +707,37 @@ async def delete_file(
             detail=f"Error al eliminar el archivo: {str(e)}"
         )
 
+def available_cpus() -> int:
+    """
+    CPUs disponibles para el proceso, respetando la afinidad y el límite
+    de CPU del contenedor (cgroup v2).
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+def prepare_multiprocess_metrics():
+    """
+    Prepara el directorio compartido de métricas Prometheus para varios workers.
+    Debe ejecutarse antes de arrancar los workers.
+    """
+    metrics_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR") or os.path.join(
+        tempfile.gettempdir(), "youtube_summary_metrics"
+    )
+    # Los valores de una ejecución anterior no deben sumarse a la actual
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+
 if __name__ == "__main__":
     # Crear directorio de outputs si no existe
     os.makedirs("outputs", exist_ok=True)
@@ -269,11 +745,19 @@ if __name__ == "__main__":
     # Configurar servidor
     port = int(os.getenv("PORT", 8000))
     host = os.getenv("HOST", "0.0.0.0")
+    workers = int(os.getenv("WEB_CONCURRENCY") or available_cpus())
+
+    if workers > 1:
+        prepare_multiprocess_metrics()
+    logger.info("🚀 Iniciando %d worker(s) en %s:%d", workers, host, port)
     
     uvicorn.run(
         "main:app",
         host=host,
         port=port,
         reload=False,
-        access_log=True
+        workers=workers,
+        access_log=True,
+        # Los logs de uvicorn se propagan al logger raíz (JSON + cola)
+        log_config=None
     )
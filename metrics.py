@@ -0,0 +1,165 @@
+"""
+Métricas Prometheus para la API y el procesador de YouTube.
+
+Todas las métricas se registran en el registro por defecto de prometheus_client
+y se exponen en el endpoint /metrics de la API. Con varios workers, main.py
+define PROMETHEUS_MULTIPROC_DIR y /metrics agrega los valores de todos ellos.
+"""
+
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Buckets pensados para etapas que van de milisegundos (parseo) a minutos (directos largos)
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Tamaños de transcripción: de un video de 1 minuto a directos de 10 horas
+SIZE_BUCKETS = (1_000, 5_000, 10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 5_000_000)
+
+STAGE_LATENCY = Histogram(
+    "youtube_stage_duration_seconds",
+    "Duración de cada etapa del procesamiento",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+
+STRATEGY_ATTEMPTS = Counter(
+    "youtube_strategy_attempts_total",
+    "Intentos de extracción por estrategia de yt-dlp y resultado",
+    ["strategy", "result"],
+)
+
+BYTES_DOWNLOADED = Counter(
+    "youtube_caption_bytes_downloaded_total",
+    "Bytes de subtítulos descargados por tipo de recurso",
+    ["kind"],
+)
+
+TRANSCRIPT_CHARACTERS = Histogram(
+    "youtube_transcript_characters",
+    "Caracteres del texto final de la transcripción",
+    buckets=SIZE_BUCKETS,
+)
+
+TRANSCRIPT_LINES = Histogram(
+    "youtube_transcript_lines",
+    "Fragmentos de texto extraídos por transcripción",
+    buckets=(10, 50, 100, 500, 1_000, 5_000, 10_000, 50_000, 100_000),
+)
+
+CACHE_REQUESTS = Counter(
+    "youtube_cache_requests_total",
+    "Consultas a las cachés por resultado (hit/miss)",
+    ["cache", "result"],
+)
+
+PROCESS_RESULTS = Counter(
+    "youtube_process_total",
+    "Videos procesados por resultado",
+    ["result"],
+)
+
+PREFETCH_VIDEOS = Counter(
+    "youtube_prefetch_videos_total",
+    "Videos de la watch-list por resultado de la precarga (processed/failed/deferred)",
+    ["result"],
+)
+
+PREFETCH_HITS = Counter(
+    "youtube_prefetch_hits_total",
+    "Peticiones servidas con una transcripción precargada",
+)
+
+IN_FLIGHT = Gauge(
+    "youtube_in_flight",
+    "Operaciones en curso",
+    ["operation"],
+    multiprocess_mode="livesum",
+)
+
+
+# Registro de etapas de la petición en curso (para la cabecera Server-Timing)
+_stage_timings = contextvars.ContextVar("stage_timings", default=None)
+
+
+@contextmanager
+def track_stage(stage: str, detail: str = None):
+    """
+    Mide la duración del bloque y la registra en el histograma de la etapa.
+    Si hay un registro de etapas activo, también la anota ahí.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.labels(stage=stage).observe(elapsed)
+        timings = _stage_timings.get()
+        if timings is not None:
+            timings.append((stage, detail, elapsed))
+
+
+@contextmanager
+def collect_stage_timings():
+    """
+    Activa el registro de etapas para el bloque y devuelve la lista
+    de tuplas (etapa, detalle, segundos) que se va llenando.
+    """
+    timings = []
+    token = _stage_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _stage_timings.reset(token)
+
+
+def format_server_timing(timings: list, total: float = None) -> str:
+    """
+    Construye el valor de la cabecera Server-Timing.
+    Las etapas repetidas con el mismo detalle (p. ej. segmentos M3U8) se agregan
+    en una sola entrada con la suma de duraciones y el número de repeticiones.
+    """
+    aggregated = {}
+    for stage, detail, elapsed in timings:
+        key = (stage, detail)
+        dur, count = aggregated.get(key, (0.0, 0))
+        aggregated[key] = (dur + elapsed, count + 1)
+
+    entries = []
+    seen = {}
+    for (stage, detail), (dur, count) in aggregated.items():
+        # Los nombres de métrica deben ser únicos: extract_info, extract_info_2, ...
+        seen[stage] = seen.get(stage, 0) + 1
+        name = stage if seen[stage] == 1 else f"{stage}_{seen[stage]}"
+        desc = detail or ""
+        if count > 1:
+            desc = f"{desc} x{count}".strip()
+        entry = f"{name};dur={dur * 1000:.1f}"
+        if desc:
+            entry += ';desc="{}"'.format(desc.replace('"', "'"))
+        entries.append(entry)
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def render_latest():
+    """
+    Devuelve el cuerpo y el content-type de la exposición Prometheus.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
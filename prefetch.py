@@ -0,0 +1,206 @@
+"""
+Precarga de la watch-list de canales y playlists.
+
+Cada PREFETCH_INTERVAL segundos un worker (solo uno, coordinado por el
+almacén compartido) lista las últimas subidas de cada fuente con extracción
+plana de yt-dlp, que no abre cada video, y extrae la transcripción de las
+nuevas con `YouTubeProcessor.obtener_fragmentos`. Solo se calienta la caché
+compartida (origen 'prefetch'): no se genera, guarda ni indexa ningún
+archivo, así que el primer usuario que pida el video solo paga la escritura
+de su propio archivo.
+
+La precarga nunca compite con los usuarios: cada llamada a YouTube (el
+listado de cada fuente y cada intento de extracción, igual que en las
+peticiones de usuarios) toma un token del presupuesto compartido y solo lo
+hace si después quedan al menos PREFETCH_RESERVE tokens. Lo que no cabe en
+el presupuesto se deja para la siguiente vuelta.
+"""
+
+import contextvars
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from logging_config import bind_request_id
+from metrics import PREFETCH_VIDEOS, track_stage
+from youtube_processor import PresupuestoAgotado, YouTubeProcessor, http_session, load_yt_dlp
+
+logger = logging.getLogger(__name__)
+
+# Canales o playlists separados por comas (p. ej. https://www.youtube.com/@canal/videos)
+PREFETCH_WATCHLIST = os.getenv("PREFETCH_WATCHLIST", "")
+PREFETCH_INTERVAL = float(os.getenv("PREFETCH_INTERVAL", 900))
+# Espera tras el arranque antes de la primera vuelta
+PREFETCH_INITIAL_DELAY = float(os.getenv("PREFETCH_INITIAL_DELAY", 30))
+# Videos procesados a la vez por el worker que hace la precarga
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", 2))
+# Subidas más recientes que se revisan de cada fuente
+PREFETCH_MAX_PER_SOURCE = int(os.getenv("PREFETCH_MAX_PER_SOURCE", 10))
+# Tokens del presupuesto de YouTube que se dejan libres para los usuarios
+PREFETCH_RESERVE = float(os.getenv("PREFETCH_RESERVE", 5))
+# Tras un fallo (p. ej. subtítulos aún no generados) se reintenta pasado este tiempo
+PREFETCH_RETRY_AFTER = float(os.getenv("PREFETCH_RETRY_AFTER", 3600))
+# Tiempo que se recuerda un video ya precargado
+PREFETCH_SEEN_TTL = float(os.getenv("PREFETCH_SEEN_TTL", 7 * 24 * 3600))
+
+# Trabajo del almacén que reparte las vueltas entre workers
+ROUND_JOB = "prefetch:round"
+
+
+def parse_watchlist(value: str) -> List[str]:
+    return [source.strip() for source in value.split(",") if source.strip()]
+
+
+def extract_flat(source: str, limit: int) -> List[Dict]:
+    """
+    Últimas `limit` entradas de un canal o playlist sin extraer cada video.
+    Si YOUTUBE_STANDIN_URL está definida, las pide al stand-in local.
+    """
+    standin_url = os.getenv("YOUTUBE_STANDIN_URL")
+    if standin_url:
+        resp = http_session.get(f"{standin_url.rstrip('/')}/flat", params={"url": source, "limit": limit})
+        resp.raise_for_status()
+        return resp.json().get("entries") or []
+
+    yt_dlp, YoutubeIE = load_yt_dlp()
+    from yt_dlp.extractor.youtube import YoutubeTabIE
+
+    opts = {
+        'extract_flat': 'in_playlist',
+        'playlistend': limit,
+        'skip_download': True,
+        'quiet': True,
+        'no_warnings': True,
+    }
+    with yt_dlp.YoutubeDL(opts, auto_init=False) as ydl:
+        ydl.add_info_extractor(YoutubeTabIE())
+        ydl.add_info_extractor(YoutubeIE())
+        info = ydl.extract_info(source, download=False)
+    return list(info.get("entries") or [])[:limit]
+
+
+class PrefetchScheduler:
+    """Planificador de la precarga; se arranca uno por worker."""
+
+    def __init__(self, sources: List[str], processor: Optional[YouTubeProcessor] = None,
+                 interval: float = PREFETCH_INTERVAL, concurrency: int = PREFETCH_CONCURRENCY):
+        self.sources = sources
+        self.processor = processor if processor is not None else YouTubeProcessor()
+        self.processor.cache_origin = "prefetch"
+        self.processor.presupuesto_reserva = PREFETCH_RESERVE
+        self.store = self.processor.store
+        self.interval = interval
+        self.concurrency = max(1, concurrency)
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+
+    def start(self, initial_delay: float = PREFETCH_INITIAL_DELAY) -> "PrefetchScheduler":
+        threading.Thread(
+            target=self._loop, args=(initial_delay,), name="prefetch", daemon=True
+        ).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self, initial_delay: float):
+        delay = initial_delay
+        while not self._stop.wait(delay):
+            delay = self.interval
+            # Una sola vuelta por intervalo entre todos los workers
+            if not self.store.claim_job(ROUND_JOB, self.worker, self.interval):
+                continue
+            started = time.time()
+            finished = threading.Event()
+            threading.Thread(
+                target=self._keep_round, args=(finished,), name="prefetch-round", daemon=True
+            ).start()
+            try:
+                # Id de correlación de la vuelta para todos sus registros
+                with bind_request_id(f"prefetch-{uuid.uuid4().hex}"):
+                    self.run_once()
+            except Exception as e:
+                logger.exception("❌ Error en la precarga: %s", e)
+            finally:
+                finished.set()
+                # El trabajo sigue reclamado hasta cumplirse el intervalo desde el
+                # inicio de la vuelta; si la vuelta duró más, queda libre ya
+                self.store.renew_job(ROUND_JOB, self.worker, max(0.0, started + self.interval - time.time()))
+
+    def _keep_round(self, finished: threading.Event):
+        """Renueva la vuelta en curso para que no expire mientras sigue trabajando."""
+        while not finished.wait(self.interval / 3):
+            if not self.store.renew_job(ROUND_JOB, self.worker, self.interval):
+                return
+
+    def run_once(self) -> Dict[str, int]:
+        """Una vuelta completa de la watch-list. Devuelve el recuento por resultado."""
+        candidates = []
+        for source in self.sources:
+            if not self.processor.consumir_presupuesto(force=False, reserve=PREFETCH_RESERVE):
+                logger.info("⏸️  Precarga: sin presupuesto para listar %s", source)
+                break
+            try:
+                with track_stage("prefetch_discover"):
+                    entries = extract_flat(source, PREFETCH_MAX_PER_SOURCE)
+            except Exception as e:
+                logger.warning("⚠️  Precarga: no se pudo listar %s: %s", source, e)
+                continue
+            for entry in entries:
+                video_id = entry.get("id")
+                if video_id and video_id not in candidates and self._is_new(video_id):
+                    candidates.append(video_id)
+
+        stats = {"processed": 0, "failed": 0, "deferred": 0}
+        if not candidates:
+            return stats
+        logger.info("🛰️  Precarga: %d videos nuevos", len(candidates))
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="prefetch") as pool:
+            # Cada video corre en el contexto de la vuelta (id de correlación)
+            futures = [
+                pool.submit(contextvars.copy_context().run, self._prefetch_video, video_id)
+                for video_id in candidates
+            ]
+            for future in futures:
+                stats[future.result()] += 1
+        logger.info("🛰️  Precarga terminada: %s", stats)
+        return stats
+
+    def _is_new(self, video_id: str) -> bool:
+        return (
+            self.store.cache_get(f"prefetch:{video_id}") is None
+            and self.store.cache_get(f"transcript:{video_id}") is None
+        )
+
+    def _prefetch_video(self, video_id: str) -> str:
+        try:
+            cues, error = self.processor.obtener_fragmentos(video_id)
+        except PresupuestoAgotado:
+            # Se queda sin marcar: la próxima vuelta lo vuelve a intentar
+            result = "deferred"
+        else:
+            result = "processed" if cues else "failed"
+            ttl = PREFETCH_SEEN_TTL if cues else PREFETCH_RETRY_AFTER
+            self.store.cache_put(f"prefetch:{video_id}", result, ttl, origin="prefetch")
+            if not cues:
+                logger.warning("⚠️  Precarga de %s fallida: %s", video_id, error)
+        PREFETCH_VIDEOS.labels(result=result).inc()
+        return result
+
+
+def start_prefetch() -> Optional[PrefetchScheduler]:
+    """Arranca la precarga si hay watch-list configurada."""
+    sources = parse_watchlist(PREFETCH_WATCHLIST)
+    if not sources:
+        return None
+    scheduler = PrefetchScheduler(sources)
+    if scheduler.processor.cache_ttl <= 0:
+        logger.warning("⚠️  Precarga desactivada: TRANSCRIPT_CACHE_TTL=0")
+        return None
+    logger.info("🛰️  Precarga de %d fuentes cada %.0f s", len(sources), scheduler.interval)
+    return scheduler.start()
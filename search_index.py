@@ -0,0 +1,447 @@
+"""
+Índice de búsqueda de texto completo sobre las transcripciones (SQLite FTS5).
+
+Cada archivo generado se indexa al escribirse en dos tablas FTS5:
+
+- `document_terms`: un documento por archivo, sin contenido (solo el índice
+  invertido). Decide qué archivos coinciden (todos los términos en cualquier
+  parte de la transcripción) y los ordena por bm25 con `ORDER BY rank LIMIT`.
+- `segments`: la transcripción en tramos pequeños (unos pocos cues
+  consecutivos) con su texto. Solo se consulta para los archivos de la
+  página devuelta: el snippet y el segundo del video de cada coincidencia
+  salen de sus primeros tramos con algún término, sin recorrer la
+  transcripción completa.
+
+Las consultas poco selectivas (un término que está en casi todos los
+archivos) se ordenan solo entre las SEARCH_RANK_WINDOW coincidencias más
+recientes: bm25 cuesta por documento que coincide y así la búsqueda no crece
+con el tamaño del índice.
+"""
+
+import bisect
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = os.path.join("outputs", "search.db")
+
+# Máximo de offsets de cues devueltos por resultado
+MAX_MATCHES_PER_RESULT = 10
+
+# Tamaño de cada tramo indexado: se cierra al llegar a SEGMENT_CUES cues o a
+# SEGMENT_CHARS caracteres (un cue más largo se parte por espacios)
+SEGMENT_CUES = 16
+SEGMENT_CHARS = 1000
+
+# Coincidencias más recientes que se ordenan por relevancia (0 = todas)
+RANK_WINDOW = int(os.getenv("SEARCH_RANK_WINDOW", "10000"))
+
+# Máximo de términos concretos en los que se expande un prefijo (término*)
+MAX_PREFIX_TERMS = 64
+
+SCHEMA_VERSION = 3
+
+# Los tramos de cada archivo ocupan un rango contiguo de rowids
+# (documents.first_segment..last_segment): borrar un archivo o buscar sus
+# coincidencias va por rango de rowid, nunca recorre la tabla FTS. El rowid de
+# document_terms es documents.id.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    file_id TEXT NOT NULL UNIQUE,
+    video_id TEXT,
+    created_at REAL NOT NULL,
+    first_segment INTEGER NOT NULL,
+    last_segment INTEGER NOT NULL,
+    timed INTEGER NOT NULL DEFAULT 0
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS segments USING fts5(
+    body,
+    document UNINDEXED,
+    starts UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS document_terms USING fts5(
+    body,
+    content = '',
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS document_vocab USING fts5vocab(document_terms, 'row');
+"""
+
+
+class _AccentTable(dict):
+    """Tabla de str.translate que quita la tilde de cada carácter la primera vez que aparece."""
+
+    def __missing__(self, codepoint: int) -> str:
+        base = unicodedata.normalize("NFKD", chr(codepoint))[0]
+        self[codepoint] = base
+        return base
+
+
+_ACCENTS = _AccentTable()
+
+
+def _normalize(text: str) -> str:
+    """
+    Minúsculas y sin tildes, conservando la longitud para que las posiciones
+    coincidan con el texto original.
+    """
+    text = text.lower()
+    return text if text.isascii() else text.translate(_ACCENTS)
+
+
+def _query_terms(query: str) -> List[str]:
+    """Términos de la consulta sin la sintaxis de FTS5, normalizados."""
+    words = re.findall(r"\w+", query, flags=re.UNICODE)
+    return [_normalize(w) for w in words if w.upper() not in ("AND", "OR", "NOT", "NEAR")]
+
+
+def _fts_query(query: str, any_term: bool = False) -> str:
+    """
+    Convierte la entrada del usuario en una consulta FTS5 segura: cada
+    término entre comillas (y con prefijo si terminaba en *). Por defecto
+    deben aparecer todos; con `any_term`, basta cualquiera.
+    """
+    terms = []
+    for token in query.split():
+        prefix = token.endswith("*")
+        word = token.rstrip("*").replace('"', "")
+        if not word:
+            continue
+        terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return (" OR " if any_term else " ").join(terms)
+
+
+def _split_long(fragment: str) -> List[str]:
+    """Parte por espacios un fragmento más largo que SEGMENT_CHARS."""
+    if len(fragment) <= SEGMENT_CHARS:
+        return [fragment]
+    pieces = []
+    while len(fragment) > SEGMENT_CHARS:
+        cut = fragment.rfind(" ", 0, SEGMENT_CHARS)
+        if cut <= 0:
+            cut = SEGMENT_CHARS
+        pieces.append(fragment[:cut])
+        fragment = fragment[cut:].lstrip(" ")
+    if fragment:
+        pieces.append(fragment)
+    return pieces
+
+
+def _segments(fragments: List[str], starts: Optional[List[Optional[float]]]) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Agrupa los fragmentos en tramos. Devuelve (texto, offsets) donde offsets es
+    el JSON de [posición dentro del tramo, segundo de inicio] de cada cue con tiempo.
+    """
+    parts: List[str] = []
+    offsets: List[Tuple[int, float]] = []
+    length = 0
+
+    def flush():
+        return " ".join(parts), json.dumps(offsets, separators=(",", ":")) if offsets else None
+
+    for i, fragment in enumerate(fragments):
+        start = starts[i] if starts and i < len(starts) else None
+        for piece in _split_long(fragment):
+            if parts and (len(parts) >= SEGMENT_CUES or length + len(piece) > SEGMENT_CHARS):
+                yield flush()
+                parts, offsets, length = [], [], 0
+            if start is not None:
+                offsets.append((length, start))
+                # Solo el primer trozo de un cue partido empieza en su segundo
+                start = None
+            parts.append(piece)
+            length += len(piece) + 1
+    if parts:
+        yield flush()
+
+
+class SearchIndex:
+    """Índice FTS5 compartido entre workers (una conexión por hilo)."""
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._migrate()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self):
+        """
+        Crea el esquema o convierte los anteriores: la versión 1 (un documento
+        FTS por archivo) se reindexa en tramos; la 2 (solo tramos) recibe el
+        índice por archivo a partir de sus tramos.
+        """
+        conn = self._connect()
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < SCHEMA_VERSION:
+                old = []
+                if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'transcripts'").fetchone():
+                    old = conn.execute(
+                        "SELECT d.file_id, d.video_id, d.offsets, t.body "
+                        "FROM documents d JOIN transcripts t ON t.rowid = d.id"
+                    ).fetchall()
+                    conn.execute("DROP TABLE transcripts")
+                    conn.execute("DROP TABLE documents")
+                    version = 1
+                # executescript confirmaría la transacción: sentencia a sentencia
+                for statement in _SCHEMA.split(";"):
+                    if statement.strip():
+                        conn.execute(statement)
+                for row in old:
+                    fragments, starts = self._v1_fragments(row["body"], row["offsets"])
+                    self._insert(conn, row["file_id"], row["video_id"], fragments, starts)
+                documents = []
+                if version == 2:
+                    documents = conn.execute("SELECT id, first_segment, last_segment FROM documents").fetchall()
+                    for document in documents:
+                        conn.execute(
+                            "INSERT INTO document_terms (rowid, body) VALUES (?, ?)",
+                            (document["id"], self._document_body(conn, document)),
+                        )
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                if old or documents:
+                    logger.info("🔎 Índice de búsqueda migrado: %d archivos reindexados", len(old) + len(documents))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _v1_fragments(body: str, offsets_json: Optional[str]) -> Tuple[List[str], Optional[List]]:
+        """Recupera los cues de un documento v1 a partir de sus offsets."""
+        offsets = json.loads(offsets_json) if offsets_json else []
+        if not offsets:
+            return [body], None
+        fragments, starts = [], []
+        if offsets[0][0] > 0:
+            fragments.append(body[:offsets[0][0]].strip())
+            starts.append(None)
+        for i, (position, start) in enumerate(offsets):
+            end = offsets[i + 1][0] if i + 1 < len(offsets) else len(body)
+            fragments.append(body[position:end].strip())
+            starts.append(start)
+        return fragments, starts
+
+    def add(self, file_id: str, video_id: str, fragments: List[str],
+            starts: Optional[List[Optional[float]]] = None):
+        """
+        Indexa la transcripción de un archivo. El texto indexado es el mismo
+        que se escribe en el archivo: los fragmentos unidos por espacios.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._remove(conn, file_id)
+            self._insert(conn, file_id, video_id, fragments, starts)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _insert(self, conn: sqlite3.Connection, file_id: str, video_id: str, fragments: List[str],
+                starts: Optional[List[Optional[float]]]):
+        # Dentro de la transacción nadie más escribe: los rowids quedan contiguos
+        last = conn.execute("SELECT rowid FROM segments ORDER BY rowid DESC LIMIT 1").fetchone()
+        first_segment = (last[0] if last else 0) + 1
+        cur = conn.execute(
+            "INSERT INTO documents (file_id, video_id, created_at, first_segment, last_segment, timed) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (file_id, video_id, time.time(), first_segment, first_segment - 1,
+             int(any(start is not None for start in starts or ()))),
+        )
+        document = cur.lastrowid
+        rowid = first_segment - 1
+        bodies = []
+        for rowid, (body, offsets) in enumerate(_segments(fragments, starts), start=first_segment):
+            conn.execute(
+                "INSERT INTO segments (rowid, body, document, starts) VALUES (?, ?, ?, ?)",
+                (rowid, body, document, offsets),
+            )
+            bodies.append(body)
+        conn.execute("UPDATE documents SET last_segment = ? WHERE id = ?", (rowid, document))
+        # Mismo texto que _document_body: el borrado debe tokenizar exactamente lo indexado
+        conn.execute("INSERT INTO document_terms (rowid, body) VALUES (?, ?)", (document, " ".join(bodies)))
+
+    @staticmethod
+    def _document_body(conn: sqlite3.Connection, document: sqlite3.Row) -> str:
+        """Texto completo de un archivo, reconstruido a partir de sus tramos."""
+        return " ".join(
+            row[0] for row in conn.execute(
+                "SELECT body FROM segments WHERE rowid BETWEEN ? AND ? ORDER BY rowid",
+                (document["first_segment"], document["last_segment"]),
+            )
+        )
+
+    def _remove(self, conn: sqlite3.Connection, file_id: str):
+        row = conn.execute(
+            "SELECT id, first_segment, last_segment FROM documents WHERE file_id = ?", (file_id,)
+        ).fetchone()
+        if row is not None:
+            # document_terms no guarda el texto: FTS5 necesita el original para borrarlo
+            conn.execute(
+                "INSERT INTO document_terms (document_terms, rowid, body) VALUES ('delete', ?, ?)",
+                (row["id"], self._document_body(conn, row)),
+            )
+            conn.execute(
+                "DELETE FROM segments WHERE rowid BETWEEN ? AND ?",
+                (row["first_segment"], row["last_segment"]),
+            )
+            conn.execute("DELETE FROM documents WHERE id = ?", (row["id"],))
+
+    def remove(self, file_id: str):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._remove(conn, file_id)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Devuelve los archivos que contienen todos los términos de la consulta
+        ordenados por relevancia (bm25 del archivo completo), con un snippet de
+        su primer tramo que coincide y, si hay tiempos, los segundos de las
+        coincidencias.
+        """
+        fts_query = _fts_query(query)
+        if not fts_query:
+            return []
+
+        conn = self._connect()
+        lower = 0
+        if RANK_WINDOW > 0:
+            # Recorrer por rowid es casi gratis; bm25 solo sobre las RANK_WINDOW más recientes
+            boundary = conn.execute(
+                "SELECT rowid FROM document_terms WHERE document_terms MATCH ? "
+                "ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+                (fts_query, RANK_WINDOW - 1),
+            ).fetchone()
+            if boundary is not None:
+                lower = boundary[0]
+        rows = conn.execute(
+            "SELECT d.id, d.file_id, d.video_id, d.first_segment, d.last_segment, d.timed, t.rank "
+            "FROM (SELECT rowid, rank FROM document_terms WHERE document_terms MATCH ? AND rowid >= ? "
+            "      ORDER BY rank LIMIT ? OFFSET ?) AS t "
+            "JOIN documents d ON d.id = t.rowid ORDER BY t.rank",
+            (fts_query, lower, limit, offset),
+        ).fetchall()
+        if not rows:
+            return []
+
+        results = []
+        any_query = self._expand_prefixes(conn, query)
+        terms = _query_terms(query)
+        for document in rows:
+            # Solo para la página devuelta: los primeros tramos del archivo con algún término
+            segments = conn.execute(
+                "SELECT body, starts, snippet(segments, 0, '[', ']', '…', 24) AS snippet FROM segments "
+                "WHERE segments MATCH ? AND rowid BETWEEN ? AND ? ORDER BY rowid LIMIT ?",
+                (any_query, document["first_segment"], document["last_segment"], MAX_MATCHES_PER_RESULT),
+            ).fetchall()
+            matches = []
+            if document["timed"] and terms:
+                matches = self._match_offsets(segments, terms)
+            results.append({
+                "file_id": document["file_id"],
+                "video_id": document["video_id"],
+                "score": round(-document["rank"], 4),
+                "snippet": segments[0]["snippet"] if segments else "",
+                "matches": matches,
+            })
+        return results
+
+    @staticmethod
+    def _expand_prefixes(conn: sqlite3.Connection, query: str) -> str:
+        """
+        Consulta de cualquier término con cada prefijo cambiado por los términos
+        del vocabulario que empiezan por él. FTS5 resuelve un prefijo mezclando
+        las listas de todos sus términos en toda la tabla aunque se filtre por
+        rowid; un término concreto salta directo al rango del archivo.
+        """
+        terms = []
+        for token in _fts_query(query, any_term=True).split(" OR "):
+            if not token.endswith("*"):
+                terms.append(token)
+                continue
+            prefix = _normalize(token[1:-2])
+            expanded = [
+                row[0] for row in conn.execute(
+                    "SELECT term FROM document_vocab WHERE term >= ? AND term < ? LIMIT ?",
+                    (prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1), MAX_PREFIX_TERMS + 1),
+                )
+            ]
+            if not expanded or len(expanded) > MAX_PREFIX_TERMS:
+                # Sin expansión útil (o demasiado larga): el prefijo tal cual, más lento pero exacto
+                terms.append(token)
+            else:
+                terms.extend(f'"{term}"' for term in expanded)
+        return " OR ".join(terms)
+
+    @staticmethod
+    def _match_offsets(segments: List[sqlite3.Row], terms: List[str]) -> List[Dict]:
+        """Segundos de inicio de los cues de esos tramos donde aparece algún término."""
+        pattern = re.compile(r"\b(?:" + "|".join(re.escape(t) for t in terms) + r")", re.UNICODE)
+        matches = []
+        for segment in segments:
+            if not segment["starts"]:
+                continue
+            body = segment["body"]
+            offsets = json.loads(segment["starts"])
+            positions = [position for position, _ in offsets]
+            seen = set()
+            for match in pattern.finditer(_normalize(body)):
+                index = bisect.bisect_right(positions, match.start()) - 1
+                if index < 0 or index in seen:
+                    continue
+                seen.add(index)
+                start_pos = positions[index]
+                end_pos = positions[index + 1] if index + 1 < len(positions) else len(body)
+                matches.append({"start": offsets[index][1], "text": body[start_pos:end_pos].strip()})
+                if len(matches) >= MAX_MATCHES_PER_RESULT:
+                    return matches
+        return matches
+
+    def count(self) -> int:
+        return self._connect().execute("SELECT count(*) FROM documents").fetchone()[0]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_search_index() -> SearchIndex:
+    """Instancia compartida del índice para este proceso."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SearchIndex(os.getenv("SEARCH_INDEX_PATH", DEFAULT_INDEX_PATH))
+    return _index
@@ -0,0 +1,346 @@
+"""
+Almacenamiento de los archivos generados.
+
+El procesador siempre escribe primero en el directorio local `outputs/` y
+después entrega el archivo al backend configurado con STORAGE_BACKEND:
+
+- local (por defecto): el propio `outputs/` es el almacenamiento definitivo.
+- s3: cualquier almacenamiento compatible con S3 (AWS, MinIO, ...). La subida
+  es multipart en streaming y la lectura se hace por bloques. `outputs/` actúa
+  como caché local de lectura (STORAGE_CACHE) para servir desde disco los
+  archivos más pedidos. El bucket es la fuente de verdad de qué archivos
+  existen (`find_artifact`, `list_artifacts`): cualquier réplica sirve, lista
+  y borra lo que generó otra.
+"""
+
+import logging
+import os
+import re
+import tempfile
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT_DIR = "outputs"
+
+# Tamaño de bloque para subidas multipart y lecturas en streaming
+CHUNK_SIZE = 8 * 1024 * 1024
+READ_CHUNK_SIZE = 256 * 1024
+
+# Nombre de los archivos generados: output_{file_id}.{txt,json}
+ARTIFACT_PREFIX = "output_"
+ARTIFACT_EXTENSIONS = (".txt", ".json")
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    """El rango pedido no cabe en el archivo (HTTP 416)."""
+
+    def __init__(self, size: Optional[int]):
+        super().__init__(f"Rango no satisfacible (tamaño {size})")
+        self.size = size
+
+
+def parse_range(byte_range: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Interpreta una cabecera Range de un solo rango como (inicio, fin) inclusivo.
+    Devuelve None si no hay rango o no se entiende (se sirve el archivo
+    completo, como permite la RFC 9110) y lanza RangeNotSatisfiable si el
+    rango queda fuera del archivo.
+    """
+    match = _RANGE_RE.match(byte_range.strip()) if byte_range else None
+    if match is None or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Sufijo: los últimos N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable(size)
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = size - 1 if last == "" else min(int(last), size - 1)
+    if last != "" and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(size)
+    return start, end
+
+
+class StorageBackend:
+    """Interfaz común de los backends de almacenamiento."""
+
+    name = "base"
+
+    def save(self, filename: str, local_path: str) -> Optional[str]:
+        """
+        Guarda el archivo escrito en `local_path` con el nombre `filename`.
+        Devuelve el ETag del objeto guardado si el backend lo proporciona.
+        """
+        raise NotImplementedError
+
+    def local_path(self, filename: str) -> Optional[str]:
+        """Ruta local desde la que servir el archivo, o None si no está en disco."""
+        raise NotImplementedError
+
+    def open_stream(self, filename: str, byte_range: Optional[str] = None) -> Optional[Dict]:
+        """
+        Abre el archivo para lectura en streaming. Devuelve un diccionario con
+        `chunks` (iterador de bytes), `size`, `status` (200/206) y, para 206,
+        `content_range`. Devuelve None si el archivo no existe y lanza
+        RangeNotSatisfiable si el rango queda fuera del archivo.
+        """
+        raise NotImplementedError
+
+    def delete(self, filename: str) -> bool:
+        raise NotImplementedError
+
+    def list_files(self, prefix: str = "") -> Iterator[Dict]:
+        """
+        Archivos guardados cuyo nombre empieza por `prefix`, como diccionarios
+        con `filename`, `size`, `created_at` y `etag` (None si el backend no
+        lo proporciona).
+        """
+        raise NotImplementedError
+
+    def find_artifact(self, file_id: str) -> Optional[Dict]:
+        """Metadatos del archivo generado `file_id` según el propio backend, o None."""
+        return next(iter(self._artifacts(f"{ARTIFACT_PREFIX}{file_id}.")), None)
+
+    def list_artifacts(self) -> List[Dict]:
+        """Todos los archivos generados según el propio backend."""
+        return sorted(self._artifacts(ARTIFACT_PREFIX), key=lambda a: a["created_at"])
+
+    def _artifacts(self, prefix: str) -> List[Dict]:
+        artifacts = []
+        for entry in self.list_files(prefix):
+            file_id, extension = os.path.splitext(entry["filename"][len(ARTIFACT_PREFIX):])
+            if extension in ARTIFACT_EXTENSIONS:
+                artifacts.append({"file_id": file_id, **entry})
+        return artifacts
+
+
+class LocalStorage(StorageBackend):
+    """Archivos en el sistema de archivos local (`outputs/`)."""
+
+    name = "local"
+
+    def __init__(self, root: str = DEFAULT_OUTPUT_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def save(self, filename: str, local_path: str) -> Optional[str]:
+        target = os.path.join(self.root, filename)
+        if os.path.abspath(local_path) != os.path.abspath(target):
+            os.replace(local_path, target)
+        return None
+
+    def local_path(self, filename: str) -> Optional[str]:
+        path = os.path.join(self.root, filename)
+        return path if os.path.exists(path) else None
+
+    def open_stream(self, filename: str, byte_range: Optional[str] = None) -> Optional[Dict]:
+        path = os.path.join(self.root, filename)
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            return None
+        requested = parse_range(byte_range, size)
+        start, end = requested if requested else (0, size - 1)
+        return {
+            "chunks": self._read_chunks(path, start, end - start + 1),
+            "size": end - start + 1,
+            "status": 206 if requested else 200,
+            "content_range": f"bytes {start}-{end}/{size}" if requested else None,
+        }
+
+    @staticmethod
+    def _read_chunks(path: str, start: int, length: int) -> Iterator[bytes]:
+        with open(path, "rb") as f:
+            f.seek(start)
+            while length > 0:
+                chunk = f.read(min(READ_CHUNK_SIZE, length))
+                if not chunk:
+                    break
+                length -= len(chunk)
+                yield chunk
+
+    def delete(self, filename: str) -> bool:
+        try:
+            os.remove(os.path.join(self.root, filename))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def list_files(self, prefix: str = "") -> Iterator[Dict]:
+        for entry in os.scandir(self.root):
+            if entry.name.startswith(prefix) and entry.is_file():
+                stats = entry.stat()
+                yield {"filename": entry.name, "size": stats.st_size, "created_at": stats.st_ctime, "etag": None}
+
+
+class S3Storage(StorageBackend):
+    """
+    Almacenamiento compatible con S3 con caché local de lectura opcional.
+    """
+
+    name = "s3"
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None,
+                 cache_dir: Optional[str] = DEFAULT_OUTPUT_DIR, cache_max_bytes: int = 0):
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.transfer_config = TransferConfig(
+            multipart_threshold=CHUNK_SIZE,
+            multipart_chunksize=CHUNK_SIZE,
+            io_chunksize=READ_CHUNK_SIZE,
+        )
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
+        self._evict_lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _key(self, filename: str) -> str:
+        return f"{self.prefix}/{filename}" if self.prefix else filename
+
+    def save(self, filename: str, local_path: str) -> Optional[str]:
+        # upload_file sube en partes de CHUNK_SIZE leyendo el archivo por bloques
+        self.client.upload_file(local_path, self.bucket, self._key(filename), Config=self.transfer_config)
+        etag = self.client.head_object(Bucket=self.bucket, Key=self._key(filename))["ETag"]
+
+        cached = os.path.join(self.cache_dir, filename) if self.cache_dir else None
+        if cached is None:
+            os.remove(local_path)
+        elif os.path.abspath(local_path) != os.path.abspath(cached):
+            os.replace(local_path, cached)
+        if cached:
+            self._evict()
+        return etag
+
+    def local_path(self, filename: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        path = os.path.join(self.cache_dir, filename)
+        return path if os.path.exists(path) else None
+
+    def open_stream(self, filename: str, byte_range: Optional[str] = None) -> Optional[Dict]:
+        params = {"Bucket": self.bucket, "Key": self._key(filename)}
+        if byte_range:
+            params["Range"] = byte_range
+        try:
+            obj = self.client.get_object(**params)
+        except self.client.exceptions.NoSuchKey:
+            return None
+        except self.client.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "InvalidRange":
+                raise
+            size = e.response["Error"].get("ActualObjectSize")
+            raise RangeNotSatisfiable(int(size) if size is not None else None)
+
+        body = obj["Body"]
+        partial = "ContentRange" in obj
+        if partial or not self.cache_dir:
+            chunks = body.iter_chunks(READ_CHUNK_SIZE)
+        else:
+            # Lectura completa: se copia a la caché mientras se envía al cliente
+            chunks = self._read_through(filename, body)
+        return {
+            "chunks": chunks,
+            "size": obj["ContentLength"],
+            "status": 206 if partial else 200,
+            "content_range": obj.get("ContentRange"),
+        }
+
+    def _read_through(self, filename: str, body) -> Iterator[bytes]:
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".partial_")
+        completed = False
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                for chunk in body.iter_chunks(READ_CHUNK_SIZE):
+                    tmp.write(chunk)
+                    yield chunk
+            os.replace(tmp_path, os.path.join(self.cache_dir, filename))
+            completed = True
+            self._evict()
+        finally:
+            if not completed:
+                # Descarga interrumpida: no dejar archivos a medias en la caché
+                try:
+                    os.remove(tmp_path)
+                except FileNotFoundError:
+                    pass
+
+    def _evict(self):
+        """Elimina de la caché los archivos menos usados si se supera el límite."""
+        if not self.cache_max_bytes:
+            return
+        with self._evict_lock:
+            entries = [
+                entry for entry in os.scandir(self.cache_dir)
+                if entry.is_file() and entry.name.startswith("output_")
+            ]
+            total = sum(entry.stat().st_size for entry in entries)
+            for entry in sorted(entries, key=lambda e: e.stat().st_atime):
+                if total <= self.cache_max_bytes:
+                    break
+                total -= entry.stat().st_size
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def delete(self, filename: str) -> bool:
+        if self.cache_dir:
+            try:
+                os.remove(os.path.join(self.cache_dir, filename))
+            except FileNotFoundError:
+                pass
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(filename))
+        return True
+
+    def list_files(self, prefix: str = "") -> Iterator[Dict]:
+        root = self._key("")
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for obj in page.get("Contents", []):
+                yield {
+                    "filename": obj["Key"][len(root):],
+                    "size": obj["Size"],
+                    "created_at": obj["LastModified"].timestamp(),
+                    "etag": obj["ETag"],
+                }
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> StorageBackend:
+    """Backend de almacenamiento configurado para este proceso."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                backend = os.getenv("STORAGE_BACKEND", "local").lower()
+                if backend == "s3":
+                    cache_enabled = os.getenv("STORAGE_CACHE", "true").lower() == "true"
+                    _storage = S3Storage(
+                        bucket=os.environ["S3_BUCKET"],
+                        prefix=os.getenv("S3_PREFIX", ""),
+                        endpoint_url=os.getenv("S3_ENDPOINT_URL") or None,
+                        cache_dir=DEFAULT_OUTPUT_DIR if cache_enabled else None,
+                        cache_max_bytes=int(os.getenv("STORAGE_CACHE_MAX_BYTES", 0)),
+                    )
+                elif backend == "local":
+                    _storage = LocalStorage(DEFAULT_OUTPUT_DIR)
+                else:
+                    raise ValueError(f"STORAGE_BACKEND no soportado: {backend}")
+                logger.info("💾 Almacenamiento: %s", _storage.name)
+    return _storage
@@ -0,0 +1,469 @@
+"""
+Almacén compartido entre workers basado en SQLite (modo WAL).
+
+Guarda la caché de transcripciones, el estado de trabajos en curso (para
+deduplicar extracciones concurrentes del mismo video entre procesos), las
+claves de idempotencia de /process, las sesiones de transcripción en
+directo, el presupuesto de peticiones a YouTube y el índice de archivos
+generados que usa /files.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = os.path.join("outputs", "store.db")
+# Cada proceso borra las filas caducadas de caché, trabajos y claves de
+# idempotencia como mucho una vez por este intervalo
+STORE_PURGE_INTERVAL = float(os.getenv("STORE_PURGE_INTERVAL", 300))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    origin TEXT NOT NULL DEFAULT 'request',
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at);
+CREATE TABLE IF NOT EXISTS jobs (
+    key TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    owner TEXT,
+    result TEXT,
+    updated_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_expires_at ON jobs (expires_at);
+CREATE TABLE IF NOT EXISTS idempotency (
+    key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    state TEXT NOT NULL,
+    result TEXT,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idempotency_expires_at ON idempotency (expires_at);
+CREATE TABLE IF NOT EXISTS live_sessions (
+    file_id TEXT PRIMARY KEY,
+    video_id TEXT NOT NULL,
+    playlist_url TEXT NOT NULL,
+    state TEXT NOT NULL,
+    next_sequence INTEGER NOT NULL DEFAULT 0,
+    size INTEGER NOT NULL,
+    owner TEXT,
+    lease_expires REAL NOT NULL,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS live_sessions_video_id ON live_sessions (video_id, state);
+CREATE TABLE IF NOT EXISTS rate_budget (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    file_id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    video_id TEXT,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    etag TEXT
+);
+"""
+
+
+class SharedStore:
+    """
+    Acceso a la base SQLite compartida. Cada hilo usa su propia conexión;
+    WAL permite lecturas concurrentes mientras un proceso escribe.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._purge_lock = threading.Lock()
+        self._next_purge = 0.0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            self._migrate(conn)
+
+    def _migrate(self, conn: sqlite3.Connection):
+        """Añade las columnas nuevas a bases creadas con versiones anteriores."""
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(artifacts)")}
+        if "etag" not in columns:
+            try:
+                conn.execute("ALTER TABLE artifacts ADD COLUMN etag TEXT")
+            except sqlite3.OperationalError:
+                # Otro worker la añadió a la vez
+                pass
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    # --- Caché -----------------------------------------------------------
+
+    def cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Devuelve {'value', 'origin'} si la entrada existe y no expiró."""
+        row = self._connect().execute(
+            "SELECT value, origin FROM cache WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        return {"value": json.loads(row["value"]), "origin": row["origin"]}
+
+    def cache_put(self, key: str, value: Any, ttl: float, origin: str = "request"):
+        self._maybe_purge()
+        now = time.time()
+        self._connect().execute(
+            "INSERT OR REPLACE INTO cache (key, value, origin, created_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), origin, now, now + ttl),
+        )
+
+    def purge_expired(self) -> Dict[str, int]:
+        """
+        Borra las entradas caducadas de la caché (transcripciones y marcas de
+        la precarga), los trabajos y las claves de idempotencia. Devuelve las
+        filas borradas por tabla.
+        """
+        now = time.time()
+        conn = self._connect()
+        return {
+            table: conn.execute(f"DELETE FROM {table} WHERE expires_at <= ?", (now,)).rowcount
+            for table in ("cache", "jobs", "idempotency")
+        }
+
+    def _maybe_purge(self):
+        """Purga oportunista al escribir: el almacén no crece sin límite."""
+        now = time.monotonic()
+        with self._purge_lock:
+            if now < self._next_purge:
+                return
+            self._next_purge = now + STORE_PURGE_INTERVAL
+        try:
+            removed = self.purge_expired()
+        except sqlite3.OperationalError as e:
+            logger.warning("⚠️  No se pudieron purgar las entradas caducadas: %s", e)
+            return
+        if any(removed.values()):
+            logger.info("🧹 Entradas caducadas purgadas: %s", removed)
+
+    # --- Trabajos --------------------------------------------------------
+
+    def claim_job(self, key: str, owner: str, ttl: float) -> bool:
+        """
+        Reclama el trabajo `key` si no hay otro en curso (o el anterior expiró).
+        Es atómico entre procesos: solo un worker obtiene True.
+        """
+        self._maybe_purge()
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT state, expires_at FROM jobs WHERE key = ?", (key,)).fetchone()
+            if row is not None and row["state"] == "running" and row["expires_at"] > now:
+                conn.execute("COMMIT")
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (key, state, owner, result, updated_at, expires_at) "
+                "VALUES (?, 'running', ?, NULL, ?, ?)",
+                (key, owner, now, now + ttl),
+            )
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def finish_job(self, key: str, state: str, result: Any = None, ttl: float = 3600):
+        now = time.time()
+        self._connect().execute(
+            "UPDATE jobs SET state = ?, result = ?, updated_at = ?, expires_at = ? WHERE key = ?",
+            (state, json.dumps(result, ensure_ascii=False) if result is not None else None, now, now + ttl, key),
+        )
+
+    def renew_job(self, key: str, owner: str, ttl: float) -> bool:
+        """
+        Fija el vencimiento de un trabajo en curso de `owner` a `ttl` segundos
+        desde ahora. Devuelve False si el trabajo ya no es suyo.
+        """
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET updated_at = ?, expires_at = ? WHERE key = ? AND owner = ? AND state = 'running'",
+            (now, now + ttl, key, owner),
+        )
+        return cursor.rowcount == 1
+
+    def get_job(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT * FROM jobs WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def delete_job(self, key: str):
+        self._connect().execute("DELETE FROM jobs WHERE key = ?", (key,))
+
+    def wait_for_job(self, key: str, timeout: float, interval: float = 0.2) -> Optional[Dict[str, Any]]:
+        """
+        Espera a que el trabajo deje de estar en curso (o expire) y lo devuelve.
+        Devuelve None si se agota el tiempo.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            job = self.get_job(key)
+            if job is None or job["state"] != "running" or job["expires_at"] <= time.time():
+                return job
+            time.sleep(interval)
+        return None
+
+    # --- Claves de idempotencia ------------------------------------------
+
+    def idempotency_begin(self, key: str, fingerprint: str, ttl: float) -> Optional[Dict[str, Any]]:
+        """
+        Reserva la clave para una petición nueva. Si ya existe una entrada
+        vigente (en curso o terminada) no la toca y la devuelve; si se
+        reservó, devuelve None. Es atómico entre procesos.
+        """
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM idempotency WHERE expires_at <= ?", (now,))
+            row = conn.execute("SELECT * FROM idempotency WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("COMMIT")
+                entry = dict(row)
+                entry["result"] = json.loads(entry["result"]) if entry["result"] else None
+                return entry
+            conn.execute(
+                "INSERT INTO idempotency (key, fingerprint, state, result, created_at, expires_at) "
+                "VALUES (?, ?, 'running', NULL, ?, ?)",
+                (key, fingerprint, now, now + ttl),
+            )
+            conn.execute("COMMIT")
+            return None
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def idempotency_renew(self, key: str, ttl: float) -> bool:
+        """
+        Amplía la reserva de una petición en curso `ttl` segundos desde ahora.
+        Devuelve False si la clave ya no está en curso.
+        """
+        cursor = self._connect().execute(
+            "UPDATE idempotency SET expires_at = ? WHERE key = ? AND state = 'running'",
+            (time.time() + ttl, key),
+        )
+        return cursor.rowcount == 1
+
+    def idempotency_finish(self, key: str, result: Any, ttl: float):
+        """Guarda la respuesta de la clave y la conserva durante `ttl` segundos."""
+        now = time.time()
+        self._connect().execute(
+            "UPDATE idempotency SET state = 'done', result = ?, expires_at = ? WHERE key = ?",
+            (json.dumps(result, ensure_ascii=False), now + ttl, key),
+        )
+
+    def idempotency_release(self, key: str):
+        """Libera la clave para que un reintento vuelva a ejecutar la petición."""
+        self._connect().execute("DELETE FROM idempotency WHERE key = ?", (key,))
+
+    # --- Sesiones en directo ---------------------------------------------
+    # `size` es el tamaño confirmado del archivo: los clientes nunca leen más
+    # allá, aunque el poller esté escribiendo el siguiente bloque.
+
+    def live_create(self, file_id: str, video_id: str, playlist_url: str, size: int,
+                    owner: str, lease_ttl: float) -> Dict[str, Any]:
+        """
+        Crea la sesión salvo que ya haya una abierta para el mismo video, en
+        cuyo caso devuelve esa. Es atómico entre procesos: dos peticiones
+        simultáneas nunca crean dos sesiones del mismo directo.
+        """
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM live_sessions WHERE video_id = ? AND state IN ('running', 'stopping') "
+                "ORDER BY created_at DESC LIMIT 1",
+                (video_id,),
+            ).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO live_sessions (file_id, video_id, playlist_url, state, next_sequence, size, "
+                    "owner, lease_expires, error, created_at, updated_at) "
+                    "VALUES (?, ?, ?, 'running', 0, ?, ?, ?, NULL, ?, ?)",
+                    (file_id, video_id, playlist_url, size, owner, now + lease_ttl, now, now),
+                )
+                row = conn.execute("SELECT * FROM live_sessions WHERE file_id = ?", (file_id,)).fetchone()
+            conn.execute("COMMIT")
+            return dict(row)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def live_get(self, file_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT * FROM live_sessions WHERE file_id = ?", (file_id,)).fetchone()
+        return dict(row) if row else None
+
+    def live_find_running(self, video_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT * FROM live_sessions WHERE video_id = ? AND state IN ('running', 'stopping') "
+            "ORDER BY created_at DESC LIMIT 1",
+            (video_id,),
+        ).fetchone()
+        return dict(row) if row else None
+
+    def live_orphans(self) -> List[str]:
+        """Sesiones sin terminar cuyo poller dejó de renovar el lease."""
+        rows = self._connect().execute(
+            "SELECT file_id FROM live_sessions WHERE state IN ('running', 'stopping') AND lease_expires <= ?",
+            (time.time(),),
+        ).fetchall()
+        return [row["file_id"] for row in rows]
+
+    def live_claim(self, file_id: str, owner: str, lease_ttl: float) -> Optional[Dict[str, Any]]:
+        """
+        Toma el poller de una sesión sin terminar cuyo lease expiró.
+        Devuelve la sesión si se obtuvo, None si otro proceso la tiene.
+        """
+        now = time.time()
+        cur = self._connect().execute(
+            "UPDATE live_sessions SET owner = ?, lease_expires = ?, updated_at = ? "
+            "WHERE file_id = ? AND state IN ('running', 'stopping') AND lease_expires <= ?",
+            (owner, now + lease_ttl, now, file_id, now),
+        )
+        return self.live_get(file_id) if cur.rowcount else None
+
+    def live_update(self, file_id: str, owner: str, next_sequence: int, size: int, lease_ttl: float) -> bool:
+        """
+        Confirma el progreso del poller y renueva su lease. Devuelve False si
+        la sesión ya no pertenece a `owner` (otro proceso la tomó).
+        """
+        now = time.time()
+        cur = self._connect().execute(
+            "UPDATE live_sessions SET next_sequence = ?, size = ?, lease_expires = ?, updated_at = ? "
+            "WHERE file_id = ? AND owner = ?",
+            (next_sequence, size, now + lease_ttl, now, file_id, owner),
+        )
+        return cur.rowcount > 0
+
+    def live_request_stop(self, file_id: str) -> bool:
+        cur = self._connect().execute(
+            "UPDATE live_sessions SET state = 'stopping', updated_at = ? WHERE file_id = ? AND state = 'running'",
+            (time.time(), file_id),
+        )
+        return cur.rowcount > 0
+
+    def live_finish(self, file_id: str, state: str, error: Optional[str] = None):
+        self._connect().execute(
+            "UPDATE live_sessions SET state = ?, error = ?, lease_expires = 0, updated_at = ? WHERE file_id = ?",
+            (state, error, time.time(), file_id),
+        )
+
+    # --- Presupuesto de peticiones ---------------------------------------
+
+    def rate_acquire(self, name: str, rate: float, burst: float, cost: float = 1.0,
+                     reserve: float = 0.0, force: bool = False) -> bool:
+        """
+        Token bucket compartido entre workers: `rate` tokens por segundo hasta
+        un máximo de `burst`. Toma `cost` tokens si después quedan al menos
+        `reserve`. Con `force` los toma siempre (el saldo puede quedar en
+        negativo, hasta -burst) para que el consumo cuente aunque no se
+        pueda esperar.
+        """
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated_at FROM rate_budget WHERE name = ?", (name,)).fetchone()
+            tokens = burst if row is None else min(burst, row["tokens"] + (now - row["updated_at"]) * rate)
+            granted = force or tokens - cost >= reserve
+            if granted:
+                tokens = max(tokens - cost, -burst)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_budget (name, tokens, updated_at) VALUES (?, ?, ?)",
+                (name, tokens, now),
+            )
+            conn.execute("COMMIT")
+            return granted
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    # --- Archivos generados ----------------------------------------------
+
+    def register_artifact(self, file_id: str, filename: str, size: int,
+                          video_id: Optional[str] = None, created_at: Optional[float] = None,
+                          etag: Optional[str] = None):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO artifacts (file_id, filename, video_id, size, created_at, etag) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (file_id, filename, video_id, size, created_at or time.time(), etag),
+        )
+
+    def list_artifacts(self) -> List[Dict[str, Any]]:
+        rows = self._connect().execute("SELECT * FROM artifacts ORDER BY created_at").fetchall()
+        return [dict(row) for row in rows]
+
+    def get_artifact(self, file_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT * FROM artifacts WHERE file_id = ?", (file_id,)).fetchone()
+        return dict(row) if row else None
+
+    def delete_artifact(self, file_id: str) -> bool:
+        cur = self._connect().execute("DELETE FROM artifacts WHERE file_id = ?", (file_id,))
+        return cur.rowcount > 0
+
+    def sync_artifacts(self, output_dir: str) -> int:
+        """
+        Registra los archivos output_* que existen en disco y aún no están
+        en el índice (p. ej. generados antes de que existiera el almacén).
+        """
+        if not os.path.isdir(output_dir):
+            return 0
+        known = {row["filename"] for row in self.list_artifacts()}
+        added = 0
+        for entry in os.scandir(output_dir):
+            if not entry.name.startswith("output_") or entry.name in known:
+                continue
+            file_id = entry.name[len("output_"):].rsplit(".", 1)[0]
+            stats = entry.stat()
+            self.register_artifact(file_id, entry.name, stats.st_size, created_at=stats.st_ctime)
+            added += 1
+        return added
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> SharedStore:
+    """Instancia compartida del almacén para este proceso."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SharedStore(os.getenv("STORE_PATH", DEFAULT_STORE_PATH))
+    return _store
@@ -6,7 +6,13 @@ Script de prueba para la API de YouTube Summary
 import requests
 import json
 import base64
-from typing import Dict, Any
+import argparse
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
 
 class YouTubeAPITester:
     def __init__(self, base_url: str = "http://localhost:8000", username: str = "admin", password: str = "password123"):
@@ -134,13 +140,373 @@ class YouTubeAPITester:
             print("❌ Error: Debería requerir autenticación")
             return False
 
+    def load_test(self, urls: List[str], concurrency: int = 10, duration: float = 30.0,
+                  mix: Optional[Dict[str, int]] = None, output_format: str = "txt",
+                  transcript_cache: str = "server") -> Dict[str, Any]:
+        """
+        Genera carga concurrente contra la API durante `duration` segundos.
+        `mix` define el peso relativo de cada operación (process, download, health).
+        `transcript_cache` solo se anota en el reporte: 'server' (la configuración
+        del servidor; con la caché activa, tras la primera petición de cada video
+        /process mide aciertos de caché) o 'disabled' (cada /process extrae).
+        Devuelve throughput, percentiles de latencia y errores por código de estado.
+        """
+        mix = mix or {"process": 1}
+        operations = list(mix)
+        weights = [mix[op] for op in operations]
+
+        file_ids: List[str] = []
+        samples = defaultdict(list)   # operación -> latencias (s)
+        statuses = defaultdict(Counter)  # operación -> código de estado -> cantidad
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        print(f"🚀 Prueba de carga: {concurrency} workers, {duration:.0f}s, mezcla {mix}")
+
+        def worker(seed: int):
+            rnd = random.Random(seed)
+            session = requests.Session()
+            session.auth = self.auth
+            while time.perf_counter() < deadline:
+                operation = rnd.choices(operations, weights)[0]
+                with lock:
+                    file_id = rnd.choice(file_ids) if file_ids else None
+                # Sin archivos generados aún, /download se sustituye por /process
+                if operation == "download" and not file_id:
+                    operation = "process"
+
+                start = time.perf_counter()
+                try:
+                    if operation == "process":
+                        resp = session.post(
+                            f"{self.base_url}/process",
+                            json={"url": rnd.choice(urls), "output_format": output_format},
+                        )
+                    elif operation == "download":
+                        resp = session.get(f"{self.base_url}/download/{file_id}")
+                    else:
+                        resp = session.get(f"{self.base_url}/health")
+                    status = resp.status_code
+                except requests.RequestException as e:
+                    resp = None
+                    status = type(e).__name__
+                elapsed = time.perf_counter() - start
+
+                with lock:
+                    samples[operation].append(elapsed)
+                    statuses[operation][status] += 1
+                    if operation == "process" and resp is not None and resp.status_code == 200:
+                        file_ids.append(resp.json()["file_id"])
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(worker, seed) for seed in range(concurrency)]
+            for future in futures:
+                future.result()
+        elapsed_total = time.perf_counter() - started
+
+        report = {
+            "concurrency": concurrency,
+            "duration": elapsed_total,
+            "transcript_cache": transcript_cache,
+            "operations": {},
+        }
+        all_latencies = []
+        all_statuses = Counter()
+        for operation, latencies in samples.items():
+            all_latencies.extend(latencies)
+            all_statuses.update(statuses[operation])
+            report["operations"][operation] = self._summarize(latencies, statuses[operation], elapsed_total)
+        report["total"] = self._summarize(all_latencies, all_statuses, elapsed_total)
+
+        self._print_load_report(report)
+        return report
+
+    @staticmethod
+    def _summarize(latencies: List[float], statuses: Counter, elapsed: float) -> Dict[str, Any]:
+        """Resume latencias (ms) y códigos de estado de una operación"""
+        ordered = sorted(latencies)
+
+        def percentile(pct: float) -> Optional[float]:
+            if not ordered:
+                return None
+            index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+            return round(ordered[index] * 1000, 1)
+
+        errors = {str(code): count for code, count in statuses.items() if code != 200}
+        return {
+            "requests": len(ordered),
+            "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed else None,
+            "p50_ms": percentile(50),
+            "p95_ms": percentile(95),
+            "p99_ms": percentile(99),
+            "max_ms": round(ordered[-1] * 1000, 1) if ordered else None,
+            "ok": statuses.get(200, 0),
+            "errors": errors,
+        }
+
+    @staticmethod
+    def _print_load_report(report: Dict[str, Any]):
+        """Imprime el reporte de la prueba de carga"""
+        print(f"\n📊 Resultados ({report['duration']:.1f}s, {report['concurrency']} workers, "
+              f"caché de transcripciones: {report['transcript_cache']})")
+        rows = list(report["operations"].items()) + [("TOTAL", report["total"])]
+        for name, data in rows:
+            print(
+                f"   {name:9} {data['requests']:6d} req  {data['throughput_rps']:8.2f} req/s  "
+                f"p50 {data['p50_ms']} ms  p95 {data['p95_ms']} ms  p99 {data['p99_ms']} ms  "
+                f"ok {data['ok']}  errores {data['errors']}"
+            )
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """Convierte 'process=3,download=1,health=1' en un diccionario de pesos"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("process", "download", "health"):
+            raise argparse.ArgumentTypeError(f"Operación no soportada: {name}")
+        mix[name] = int(weight or 1)
+    return mix
+
+def load_main(args):
+    """Modo de prueba de carga"""
+    import os
+    import shutil
+    import tempfile
+
+    tester = YouTubeAPITester(args.base_url, args.username, args.password)
+
+    standin = None
+    server = None
+    workdir = None
+    transcript_cache = "server"
+    if args.offline:
+        # Videos de fixture servidos por el stand-in local (sin red)
+        from benchmarks import fixtures
+        from benchmarks.standin import YouTubeStandIn
+
+        standin = YouTubeStandIn(port=args.standin_port, latency=args.standin_latency,
+                                 failure_rate=args.standin_failure_rate).start()
+        print(f"🎭 Stand-in en {standin.base_url} (el servidor debe usar YOUTUBE_STANDIN_URL={standin.base_url})")
+        urls = [
+            f"https://www.youtube.com/watch?v={fixtures.fixture_video_id(fmt, minutes)}"
+            for fmt in ("ttml", "vtt", "m3u8")
+            for minutes in (1, 10)
+        ]
+        if args.no_cache:
+            # Worker propio sin caché de transcripciones: con solo 6 videos de
+            # fixture, la caché convertiría casi todos los /process en aciertos
+            workdir = tempfile.mkdtemp(prefix="load_")
+            server, tester.base_url = _start_server(workdir, {
+                **os.environ,
+                "YOUTUBE_STANDIN_URL": standin.base_url,
+                "API_USERNAME": args.username,
+                "API_PASSWORD": args.password,
+                "LOG_LEVEL": "WARNING",
+                "TRANSCRIPT_CACHE_TTL": "0",
+            })
+            transcript_cache = "disabled"
+            print(f"🧊 Worker sin caché de transcripciones en {tester.base_url}")
+    else:
+        urls = args.urls or ["https://www.youtube.com/watch?v=jNQXAC9IVRw"]
+
+    try:
+        report = tester.load_test(urls, args.concurrency, args.duration, args.mix, args.output_format,
+                                  transcript_cache)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+            shutil.rmtree(workdir, ignore_errors=True)
+        if standin:
+            standin.stop()
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Reporte guardado en {args.report}")
+
+def _free_port() -> int:
+    import socket
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _start_server(workdir: str, env: Dict[str, str]):
+    """Arranca un worker de la API en `workdir` (su outputs/ y su almacén) y espera a /health"""
+    import os
+    import subprocess
+    import sys
+
+    root = os.path.dirname(os.path.abspath(__file__))
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", root,
+         "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return proc, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("El servidor no arrancó")
+
+def live_failover_main(args) -> bool:
+    """
+    Toma de un directo por otro worker, sin red: levanta el stand-in y dos
+    workers que comparten almacén y outputs/ en un directorio temporal.
+
+    1. Dos POST /live simultáneos del mismo directo, a los workers A y C,
+       crean una sola sesión.
+    2. Se lee texto del directo y se mata a A y C con SIGKILL (el poller
+       muere sin cerrar la sesión).
+    3. Arranca el worker B: el archivo del directo en curso no aparece en /files.
+    4. B retoma el poller al expirar el lease y el cliente sigue desde su cursor.
+    5. El texto leído y el archivo final coinciden con la transcripción del
+       video equivalente procesado con /process.
+    """
+    import os
+    import shutil
+    import signal
+    import tempfile
+
+    from artifact_writer import PROMPT_HEADER
+    from benchmarks import fixtures
+    from benchmarks.standin import YouTubeStandIn
+
+    live_id = fixtures.fixture_video_id(fixtures.LIVE_FORMAT, args.live_minutes)
+    vod_id = fixtures.fixture_video_id("m3u8", args.live_minutes)
+    auth = (args.username, args.password)
+    failures = []
+
+    def check(condition: bool, message: str):
+        print(f"{'✅' if condition else '❌'} {message}")
+        if not condition:
+            failures.append(message)
+
+    standin = YouTubeStandIn(live_speed=args.live_speed).start()
+    workdir = tempfile.mkdtemp(prefix="live_failover_")
+    env = {
+        **os.environ,
+        "YOUTUBE_STANDIN_URL": standin.base_url,
+        "API_USERNAME": args.username,
+        "API_PASSWORD": args.password,
+        "WARMUP": "false",
+        "LOG_LEVEL": "WARNING",
+        "LIVE_LEASE_TTL": str(args.lease_ttl),
+        "LIVE_POLL_INTERVAL": "0.5",
+    }
+    servers = []
+    try:
+        proc_a, url_a = _start_server(workdir, env)
+        proc_c, url_c = _start_server(workdir, env)
+        servers.extend([proc_a, proc_c])
+        print(f"🔴 Directo {live_id} en los workers A ({url_a}) y C ({url_c})")
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            responses = list(pool.map(
+                lambda url: requests.post(f"{url}/live", json={"url": f"https://www.youtube.com/live/{live_id}"},
+                                          auth=auth),
+                (url_a, url_c)
+            ))
+        check(all(r.status_code == 200 for r in responses), "POST /live responde 200")
+        file_ids = {r.json()["file_id"] for r in responses if r.status_code == 200}
+        check(len(file_ids) == 1, f"Dos POST /live simultáneos crean una sola sesión ({len(file_ids)})")
+        if not file_ids:
+            return False
+        file_id = file_ids.pop()
+        cursor = responses[0].json()["cursor"]
+
+        text = ""
+        while not text:
+            delta = requests.get(f"{url_a}/live/{file_id}", params={"cursor": cursor, "wait": 5}, auth=auth).json()
+            text += delta["text"]
+            cursor = delta["cursor"]
+        print(f"💀 SIGKILL a los workers A y C con {len(text)} caracteres leídos (cursor {cursor})")
+        for proc in (proc_a, proc_c):
+            proc.send_signal(signal.SIGKILL)
+            proc.wait()
+
+        proc_b, url_b = _start_server(workdir, env)
+        servers.append(proc_b)
+        listed = [f["file_id"] for f in requests.get(f"{url_b}/files", auth=auth).json()["files"]]
+        check(file_id not in listed, "El directo en curso no se registra como archivo al arrancar otro worker")
+
+        state = "running"
+        deadline = time.monotonic() + args.live_minutes * 60 / args.live_speed + args.lease_ttl + 60
+        while state in ("running", "stopping") and time.monotonic() < deadline:
+            delta = requests.get(f"{url_b}/live/{file_id}", params={"cursor": cursor, "wait": 5}, auth=auth).json()
+            text += delta["text"]
+            cursor = delta["cursor"]
+            state = delta["state"]
+        check(state == "finished", f"El worker B retoma el directo y lo termina (estado {state})")
+
+        live_file = requests.get(f"{url_b}/download/{file_id}", auth=auth).content.decode("utf-8")
+        check(live_file == PROMPT_HEADER + text, "El archivo final coincide con el texto leído por cursor")
+
+        vod = requests.post(f"{url_b}/process", json={"url": f"https://www.youtube.com/watch?v={vod_id}"},
+                            auth=auth).json()
+        vod_file = requests.get(f"{url_b}/download/{vod['file_id']}", auth=auth).content.decode("utf-8")
+        check(live_file == vod_file, f"El directo coincide con la transcripción de {vod_id}")
+    finally:
+        for proc in servers:
+            if proc.poll() is None:
+                proc.terminate()
+                proc.wait()
+        standin.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n✅ Toma del directo verificada" if not failures else f"\n❌ {len(failures)} comprobaciones fallidas")
+    return not failures
+
 def main():
     """Función principal de pruebas"""
+    parser = argparse.ArgumentParser(description="Pruebas de la API YouTube Summary")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--load", action="store_true", help="Modo prueba de carga concurrente")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30.0, help="Duración en segundos")
+    parser.add_argument("--mix", type=parse_mix, default={"process": 3, "download": 1, "health": 1},
+                        help="Pesos por operación, p. ej. process=3,download=1,health=1")
+    parser.add_argument("--output-format", default="txt", choices=["txt", "json"])
+    parser.add_argument("--urls", nargs="+", help="URLs de YouTube a procesar")
+    parser.add_argument("--offline", action="store_true", help="Usar el stand-in local de YouTube")
+    parser.add_argument("--standin-port", type=int, default=8765)
+    parser.add_argument("--standin-latency", type=float, default=0.0)
+    parser.add_argument("--standin-failure-rate", type=float, default=0.0)
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Con --offline, arranca un worker propio con TRANSCRIPT_CACHE_TTL=0 "
+                             "(mide la extracción, no los aciertos de caché)")
+    parser.add_argument("--report", help="Guardar el reporte en JSON")
+    parser.add_argument("--live-failover", action="store_true",
+                        help="Prueba sin red de la toma de un directo por otro worker")
+    parser.add_argument("--live-minutes", type=int, default=10, help="Duración del directo simulado")
+    parser.add_argument("--live-speed", type=float, default=60.0,
+                        help="Segundos de directo simulado por segundo real")
+    parser.add_argument("--lease-ttl", type=float, default=3.0, help="LIVE_LEASE_TTL de los workers")
+    args = parser.parse_args()
+    if args.no_cache and not args.offline:
+        parser.error("--no-cache requiere --offline")
+
+    if args.load:
+        load_main(args)
+        return
+    if args.live_failover:
+        raise SystemExit(0 if live_failover_main(args) else 1)
+
     print("🚀 Iniciando pruebas de la API YouTube Summary")
     print("=" * 50)
     
     # Inicializar tester
-    tester = YouTubeAPITester()
+    tester = YouTubeAPITester(args.base_url, args.username, args.password)
     
     # Pruebas básicas
     print("\n1. Pruebas básicas")
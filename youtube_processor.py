@@ -1,17 +1,105 @@
-import yt_dlp
 import requests
 import re
-import traceback
 import xml.etree.ElementTree as ET
-import json
+import logging
 import os
+import socket
+import threading
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+from artifact_writer import transcript_length, write_json, write_txt
+from metrics import (
+    BYTES_DOWNLOADED,
+    CACHE_REQUESTS,
+    IN_FLIGHT,
+    PREFETCH_HITS,
+    PROCESS_RESULTS,
+    STRATEGY_ATTEMPTS,
+    TRANSCRIPT_CHARACTERS,
+    TRANSCRIPT_LINES,
+    track_stage,
+)
+from requests.adapters import HTTPAdapter
+from search_index import SearchIndex, get_search_index
+from store import SharedStore, get_store
+from storage import StorageBackend, get_storage
+
+logger = logging.getLogger(__name__)
+
+# Vida de las transcripciones en la caché compartida (0 la desactiva)
+TRANSCRIPT_CACHE_TTL = float(os.getenv("TRANSCRIPT_CACHE_TTL", 24 * 3600))
+# Tiempo máximo que una extracción en curso bloquea a otros workers
+INFLIGHT_TTL = float(os.getenv("INFLIGHT_TTL", 600))
+# Presupuesto de llamadas a YouTube compartido entre workers (0 lo desactiva).
+# Las peticiones de usuarios nunca esperan: solo consumen; la precarga solo
+# avanza si queda saldo.
+YOUTUBE_RATE_PER_MINUTE = float(os.getenv("YOUTUBE_RATE_PER_MINUTE", 60))
+YOUTUBE_RATE_BURST = float(os.getenv("YOUTUBE_RATE_BURST", 20))
+# Sangría de los archivos JSON generados (0: compacto)
+ARTIFACT_JSON_INDENT = int(os.getenv("ARTIFACT_JSON_INDENT", 0))
+
+# Sesión HTTP compartida: reutiliza conexiones (keep-alive) entre peticiones y segmentos
+http_session = requests.Session()
+http_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+http_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+
+_yt_dlp_lock = threading.Lock()
+_yt_dlp = None
+
+def load_yt_dlp():
+    """
+    Importa yt_dlp y el extractor de YouTube bajo demanda.
+    Importar yt_dlp es costoso, así que no se hace al importar este módulo.
+    Devuelve (módulo yt_dlp, clase YoutubeIE).
+    """
+    global _yt_dlp
+    if _yt_dlp is None:
+        with _yt_dlp_lock:
+            if _yt_dlp is None:
+                import yt_dlp
+                from yt_dlp.extractor.youtube import YoutubeIE
+                _yt_dlp = (yt_dlp, YoutubeIE)
+    return _yt_dlp
+
+def warm_up():
+    """
+    Prepara en segundo plano lo que la primera petición pagaría:
+    importa yt_dlp, instancia el extractor de YouTube y abre una conexión
+    del pool HTTP con el host de subtítulos.
+    """
+    with track_stage("warmup"):
+        try:
+            yt_dlp, YoutubeIE = load_yt_dlp()
+            with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}, auto_init=False) as ydl:
+                ydl.add_info_extractor(YoutubeIE())
+            target = os.getenv("YOUTUBE_STANDIN_URL") or "https://www.youtube.com"
+            http_session.head(target, timeout=5)
+            logger.info("🔥 Warm-up completado")
+        except Exception as e:
+            logger.warning("⚠️  Warm-up incompleto: %s", e)
+
+class PresupuestoAgotado(Exception):
+    """No queda presupuesto de YouTube para una llamada que puede esperar (precarga)."""
+
 
 class YouTubeProcessor:
-    def __init__(self):
+    def __init__(self, store: Optional[SharedStore] = None, storage: Optional[StorageBackend] = None,
+                 search_index: Optional[SearchIndex] = None):
         self.output_dir = "outputs"
         os.makedirs(self.output_dir, exist_ok=True)
+        # Destino final de los archivos (disco local o S3); output_dir es el área de escritura
+        self.storage = storage if storage is not None else get_storage()
+        # Caché de transcripciones, trabajos en curso e índice de archivos compartidos entre workers
+        self.store = store if store is not None else get_store()
+        self.cache_ttl = TRANSCRIPT_CACHE_TTL
+        # Quién genera las entradas de caché: 'request' (usuarios) o 'prefetch'
+        self.cache_origin = "request"
+        # Tokens que deben quedar libres tras cada llamada a YouTube. None: la
+        # llamada se cobra siempre (usuarios); con un valor, si no caben se
+        # lanza PresupuestoAgotado (precarga)
+        self.presupuesto_reserva: Optional[float] = None
+        # Índice de texto completo para /search
+        self.search_index = search_index if search_index is not None else get_search_index()
 
     def extract_youtube_id(self, url_input: str) -> Optional[str]:
         """
@@ -22,7 +110,7 @@ class YouTubeProcessor:
         url_input = str(url_input).strip()
         youtube_regex = (
             r'(?:https?://)?(?:www\.)?'
-            r'(?:youtube\.com/(?:watch\?v=|live\?v=|shorts/)|youtu\.be/)'
+            r'(?:youtube\.com/(?:watch\?v=|live\?v=|live/|shorts/)|youtu\.be/)'
             r'([A-Za-z0-9_-]{11})'
         )
         match = re.search(youtube_regex, url_input)
@@ -35,75 +123,112 @@ class YouTubeProcessor:
         Devuelve una lista de líneas de texto.
         """
         try:
-            print(f"🔄 Descargando subtítulos desde: {url}")
-            resp = requests.get(url)
-            resp.raise_for_status()
-            print(f"✅ Descarga exitosa. Tamaño: {len(resp.text)} caracteres")
+            logger.debug("🔄 Descargando subtítulos desde: %s", url)
+            with track_stage("caption_download"):
+                resp = http_session.get(url)
+                resp.raise_for_status()
+            BYTES_DOWNLOADED.labels(kind="caption").inc(len(resp.content))
+            logger.info("✅ Descarga exitosa. Tamaño: %d caracteres", len(resp.text))
         except Exception as e:
-            print(f"❌ Error al descargar subtítulos: {e}")
-            traceback.print_exc()
+            logger.exception("❌ Error al descargar subtítulos: %s", e)
             return None
 
         content = resp.text
         
         # Si es una playlist M3U8, extraer las URLs de los segmentos
         if content.startswith('#EXTM3U') or '.m3u8' in url:
-            print("📋 Detectada playlist M3U8, extrayendo segmentos...")
+            logger.info("📋 Detectada playlist M3U8, extrayendo segmentos...")
             segment_urls = []
             lines = content.splitlines()
             
             for line in lines:
                 line = line.strip()
-                if line.startswith('https://') and 'timedtext' in line:
+                if line.startswith(('https://', 'http://')) and 'timedtext' in line:
                     segment_urls.append(line)
             
-            print(f"🔗 Encontrados {len(segment_urls)} segmentos de subtítulos")
+            logger.info("🔗 Encontrados %d segmentos de subtítulos", len(segment_urls))
             
             # Descargar todos los segmentos
             all_transcript = []
             for i, segment_url in enumerate(segment_urls):
                 try:
-                    print(f"📥 Descargando segmento {i+1}/{len(segment_urls)}...")
-                    seg_resp = requests.get(segment_url)
-                    seg_resp.raise_for_status()
-                    
-                    # Parsear el contenido VTT del segmento
-                    segment_lines = seg_resp.text.splitlines()
-                    for line in segment_lines:
-                        line = line.strip()
-                        # Omitir líneas vacías, numeración, timestamps y metadatos VTT
-                        if (not line or line.startswith('WEBVTT') or 
-                            re.match(r'^\d+$', line) or '-->' in line or 
-                            re.match(r'^\d{2}:\d{2}:\d{2}\.', line) or
-                            line.startswith('NOTE')):
-                            continue
-                        all_transcript.append(line)
-                            
+                    logger.debug("📥 Descargando segmento %d/%d...", i + 1, len(segment_urls))
+                    all_transcript.extend(self.descargar_segmento(segment_url))
                 except Exception as e:
-                    print(f"⚠️  Error descargando segmento {i+1}: {e}")
+                    logger.warning("⚠️  Error descargando segmento %d: %s", i + 1, e)
                     continue
             
             transcript = all_transcript
         else:
             # Procesamiento normal para archivos VTT/SRT directos
-            lines = content.splitlines()
-            transcript = []
-            for line in lines:
-                line = line.strip()
-                # Omitir líneas vacías, numeración, timestamps y metadatos VTT
-                if (not line or line.startswith('WEBVTT') or 
-                    re.match(r'^\d+$', line) or '-->' in line or 
-                    re.match(r'^\d{2}:\d{2}:\d{2}\.', line) or
-                    line.startswith('NOTE')):
-                    continue
-                transcript.append(line)
+            transcript = self.parsear_lineas_subtitulo(content)
         
-        print(f"✅ Extraídas {len(transcript)} líneas de texto")
+        logger.info("✅ Extraídas %d líneas de texto", len(transcript))
         return transcript
 
+    def descargar_segmento(self, url: str) -> List[str]:
+        """Descarga un segmento VTT de una playlist M3U8 y devuelve sus líneas."""
+        with track_stage("m3u8_segment"):
+            resp = http_session.get(url)
+            resp.raise_for_status()
+        BYTES_DOWNLOADED.labels(kind="m3u8_segment").inc(len(resp.content))
+        # WebVTT siempre es UTF-8; sin charset requests asumiría ISO-8859-1
+        resp.encoding = "utf-8"
+        return self.parsear_lineas_subtitulo(resp.text)
+
+    def parsear_lineas_subtitulo(self, content: str) -> List[str]:
+        """
+        Parsea el contenido de un archivo VTT/SRT/TTML y devuelve sus líneas de texto,
+        omitiendo líneas vacías, numeración, timestamps y metadatos VTT.
+        """
+        transcript = []
+        for line in content.splitlines():
+            line = line.strip()
+            if (not line or line.startswith('WEBVTT') or
+                re.match(r'^\d+$', line) or '-->' in line or
+                re.match(r'^\d{2}:\d{2}:\d{2}\.', line) or
+                line.startswith('NOTE')):
+                continue
+            transcript.append(line)
+        return transcript
+
+    def _extract_info(self, video_id: str, opts: Dict) -> Dict:
+        """
+        Obtiene la información del video con yt-dlp.
+        Si YOUTUBE_STANDIN_URL está definida, la pide al stand-in local
+        (benchmarks/standin.py) en lugar de a YouTube.
+        """
+        standin_url = os.getenv("YOUTUBE_STANDIN_URL")
+        if standin_url:
+            resp = http_session.get(f"{standin_url.rstrip('/')}/info/{video_id}")
+            resp.raise_for_status()
+            return resp.json()
+
+        # Solo se registra el extractor de YouTube, no los cientos que trae yt-dlp
+        yt_dlp, YoutubeIE = load_yt_dlp()
+        with yt_dlp.YoutubeDL(opts, auto_init=False) as ydl:
+            ydl.add_info_extractor(YoutubeIE())
+            return ydl.extract_info(
+                f'https://www.youtube.com/watch?v={video_id}', download=False, ie_key=YoutubeIE.ie_key()
+            )
+
     def obtener_transcripcion(self, video_id: str) -> Optional[List[str]]:
         """
         Obtiene la transcripción de un video de YouTube usando yt-dlp.
+        """
+        info = self.obtener_info(video_id)
+        if info is None:
+            return None
+
+        url = self.seleccionar_subtitulos(info)
+        if url is None:
+            logger.warning("❌ No se encontró transcripción en ningún idioma soportado.")
+            return None
+        return self.descargar_y_parsear_subtitulos(url)
+
+    def obtener_info(self, video_id: str) -> Optional[Dict]:
+        """
+        Obtiene la información del video con yt-dlp.
         Intenta múltiples estrategias para evitar bloqueos de bot.
         """
         
@@ -165,37 +290,66 @@ class YouTubeProcessor:
         ]
 
         for strategy in strategies:
+            # Cada intento cuenta como una llamada a YouTube
+            if self.presupuesto_reserva is None:
+                self.consumir_presupuesto()
+            elif not self.consumir_presupuesto(force=False, reserve=self.presupuesto_reserva):
+                raise PresupuestoAgotado(video_id)
             try:
-                print(f"🔄 Intentando estrategia: {strategy['name']}")
-                with yt_dlp.YoutubeDL(strategy['opts']) as ydl:
-                    info = ydl.extract_info(f'https://www.youtube.com/watch?v={video_id}', download=False)
+                logger.info("🔄 Intentando estrategia: %s", strategy['name'])
+                with track_stage("extract_info", strategy['name']):
+                    info = self._extract_info(video_id, strategy['opts'])
                 
                 # Si llegamos aquí, la extracción fue exitosa
-                print(f"✅ Estrategia exitosa: {strategy['name']}")
+                STRATEGY_ATTEMPTS.labels(strategy=strategy['name'], result="success").inc()
+                logger.info("✅ Estrategia exitosa: %s", strategy['name'])
                 break
                 
             except Exception as e:
-                print(f"❌ Estrategia '{strategy['name']}' falló: {e}")
+                STRATEGY_ATTEMPTS.labels(strategy=strategy['name'], result="failure").inc()
+                logger.warning("❌ Estrategia '%s' falló: %s", strategy['name'], e)
                 if strategy == strategies[-1]:  # Última estrategia
-                    print("❌ Todas las estrategias fallaron")
-                    traceback.print_exc()
+                    logger.exception("❌ Todas las estrategias fallaron")
                     return None
                 continue
 
+        return info
+
+    def consumir_presupuesto(self, force: bool = True, reserve: float = 0.0) -> bool:
+        """
+        Descuenta una llamada a YouTube del presupuesto compartido. Devuelve
+        False si no hay saldo (solo posible sin `force`).
+        """
+        if YOUTUBE_RATE_PER_MINUTE <= 0:
+            return True
+        return self.store.rate_acquire(
+            "youtube", YOUTUBE_RATE_PER_MINUTE / 60, YOUTUBE_RATE_BURST, reserve=reserve, force=force
+        )
+
+    def seleccionar_subtitulos(self, info: Dict, solo_m3u8: bool = False) -> Optional[str]:
+        """
+        Devuelve la URL de la pista de subtítulos a usar, o None.
+        Con `solo_m3u8` solo se consideran playlists M3U8 (directos).
+        """
         # Fuentes en orden: auto-generated, luego manual
         for source in ('automatic_captions', 'subtitles'):
             captions = info.get(source) or {}
             for lang in ['es', 'en']:
                 if lang in captions:
                     entries = captions[lang]
+                    if solo_m3u8:
+                        entries = [
+                            c for c in entries
+                            if 'm3u8' in (c.get('protocol') or '') or '.m3u8' in (c.get('url') or '')
+                        ]
+                        if not entries:
+                            continue
                     # Elegir la primera pista .vtt/.srt/ttml
                     entry = next((c for c in entries if c.get('ext') in ('vtt', 'srt', 'ttml')), entries[0])
                     url = entry.get('url')
                     if url:
-                        print(f"✅ Transcripción encontrada ({source}) en: {lang}")
-                        return self.descargar_y_parsear_subtitulos(url)
-
-        print("❌ No se encontró transcripción en ningún idioma soportado.")
+                        logger.info("✅ Transcripción encontrada (%s) en: %s", source, lang)
+                        return url
         return None
 
     def extraer_texto_de_p(self, lineas: List[str]) -> List[str]:
@@ -203,8 +357,31 @@ class YouTubeProcessor:
         Dada una lista de líneas, extrae el texto útil.
         Maneja tanto formato XML como texto plano.
         """
+        return self.extraer_cues(lineas)[0]
+
+    @staticmethod
+    def _segundos(valor: Optional[str]) -> Optional[float]:
+        """Convierte un tiempo TTML ('00:01:02.500' o '62.5s') a segundos."""
+        if not valor:
+            return None
+        try:
+            if valor.endswith('s'):
+                return float(valor[:-1])
+            segundos = 0.0
+            for parte in valor.split(':'):
+                segundos = segundos * 60 + float(parte)
+            return segundos
+        except ValueError:
+            return None
+
+    def extraer_cues(self, lineas: List[str]) -> Tuple[List[str], List[Optional[float]]]:
+        """
+        Como extraer_texto_de_p, pero devuelve también el segundo de inicio de
+        cada fragmento cuando la línea lo indica (atributo `begin` de TTML).
+        """
         textos = []
-        print(f"🔍 Procesando {len(lineas)} líneas para extraer texto...")
+        inicios = []
+        logger.info("🔍 Procesando %d líneas para extraer texto...", len(lineas))
         
         for linea in lineas:
             linea = linea.strip()
@@ -218,93 +395,199 @@ class YouTubeProcessor:
                     elemento = ET.fromstring(linea)
                     if elemento.text:
                         textos.append(elemento.text.strip())
+                        inicios.append(self._segundos(elemento.get('begin')))
                 except ET.ParseError:
                     # Si no es XML válido, extraer texto entre > y <
                     texto_extraido = re.sub(r'<[^>]*>', '', linea).strip()
                     if texto_extraido:
                         textos.append(texto_extraido)
+                        inicios.append(None)
             else:
                 # Si no tiene etiquetas XML, es texto plano
                 if linea and not re.match(r'^\d+$', linea) and '-->' not in linea:
                     textos.append(linea)
+                    inicios.append(None)
         
-        print(f"✅ Extraídos {len(textos)} fragmentos de texto")
-        if textos:
-            print(f"📝 Muestra del primer fragmento: {textos[0][:100]}...")
+        logger.info("✅ Extraídos %d fragmentos de texto", len(textos))
+        if textos and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📝 Muestra del primer fragmento: %s...", textos[0][:100])
         
-        return textos
+        return textos, inicios
+
+    def _extraer_fragmentos(self, video_id: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        Descarga la transcripción y extrae sus fragmentos de texto.
+        Devuelve ({'fragments', 'starts'}, None) o (None, mensaje de error).
+        `starts` tiene el segundo de inicio de cada fragmento, o es None si el
+        formato de subtítulos no trae tiempos.
+        """
+        transcript = self.obtener_transcripcion(video_id)
+        if not transcript:
+            return None, "No se encontró transcripción para este video."
+
+        logger.info("📄 Transcripción inicial: %d líneas", len(transcript))
+        with track_stage("parse"):
+            fragments, starts = self.extraer_cues(transcript)
+
+        if not fragments:
+            return None, "No se pudo extraer texto de la transcripción."
+        if all(start is None for start in starts):
+            starts = None
+        return {"fragments": fragments, "starts": starts}, None
+
+    def obtener_fragmentos(self, video_id: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        Igual que _extraer_fragmentos pero usando la caché compartida.
+        Si otro worker ya está extrayendo el mismo video, espera su resultado
+        en lugar de repetir la petición a YouTube.
+        """
+        if self.cache_ttl <= 0:
+            return self._extraer_fragmentos(video_id)
+
+        # Solo cuentan las consultas de usuarios: la precarga tiene sus métricas
+        count = self.cache_origin == "request"
+        cache_key = f"transcript:{video_id}"
+        cached = self.store.cache_get(cache_key)
+        if cached is not None:
+            if count:
+                CACHE_REQUESTS.labels(cache="transcript", result="hit").inc()
+                if cached["origin"] == "prefetch":
+                    PREFETCH_HITS.inc()
+            logger.info("⚡ Transcripción en caché para %s", video_id)
+            return self._desde_cache(cached["value"]), None
+        if count:
+            CACHE_REQUESTS.labels(cache="transcript", result="miss").inc()
+
+        job_key = f"extract:{video_id}"
+        owner = f"{socket.gethostname()}:{os.getpid()}"
+        if not self.store.claim_job(job_key, owner, INFLIGHT_TTL):
+            logger.info("⏳ Otro worker está extrayendo %s, esperando su resultado", video_id)
+            with track_stage("inflight_wait"):
+                job = self.store.wait_for_job(job_key, INFLIGHT_TTL)
+            cached = self.store.cache_get(cache_key)
+            if cached is not None:
+                if count:
+                    CACHE_REQUESTS.labels(cache="transcript", result="dedup").inc()
+                    if cached["origin"] == "prefetch":
+                        PREFETCH_HITS.inc()
+                return self._desde_cache(cached["value"]), None
+            if job is not None and job["state"] == "failed" and job["result"]:
+                return None, job["result"]["error"]
+            # El otro worker no terminó a tiempo: extraer directamente
+            return self._extraer_fragmentos(video_id)
+
+        transcript, error = None, "Error interno durante la extracción"
+        aplazado = False
+        try:
+            transcript, error = self._extraer_fragmentos(video_id)
+            if transcript:
+                self.store.cache_put(cache_key, transcript, self.cache_ttl, origin=self.cache_origin)
+        except PresupuestoAgotado:
+            aplazado = True
+            raise
+        finally:
+            if aplazado:
+                # No hay resultado que compartir: quien esté esperando extrae por su cuenta
+                self.store.delete_job(job_key)
+            else:
+                # El estado final se conserva poco tiempo: solo sirve a quien estaba esperando
+                self.store.finish_job(
+                    job_key,
+                    "done" if transcript else "failed",
+                    None if transcript else {"error": error},
+                    ttl=60,
+                )
+        return transcript, error
+
+    @staticmethod
+    def _desde_cache(value) -> Dict:
+        """Las entradas antiguas de la caché guardaban solo la lista de fragmentos."""
+        if isinstance(value, list):
+            return {"fragments": value, "starts": None}
+        return value
 
     def process_video(self, video_id: str, file_id: str, output_format: str = "txt") -> Dict:
         """
         Procesa un video de YouTube y genera el archivo de salida
         """
+        with IN_FLIGHT.labels(operation="process_video").track_inprogress():
+            result = self._process_video(video_id, file_id, output_format)
+        PROCESS_RESULTS.labels(result="success" if result["success"] else "failure").inc()
+        return result
+
+    def _process_video(self, video_id: str, file_id: str, output_format: str) -> Dict:
         try:
             # Obtener la transcripción
-            print(f"🎬 Procesando video ID: {video_id}")
-            transcript = self.obtener_transcripcion(video_id)
-            if not transcript:
+            logger.info("🎬 Procesando video ID: %s", video_id, extra={"video_id": video_id, "file_id": file_id})
+            cues, error = self.obtener_fragmentos(video_id)
+            if not cues:
                 return {
                     "success": False,
-                    "message": "No se encontró transcripción para este video."
+                    "message": error
                 }
+            transcript = cues["fragments"]
 
-            print(f"📄 Transcripción inicial: {len(transcript)} líneas")
-            transcript = self.extraer_texto_de_p(transcript)
+            # El texto unido no se construye: el escritor lo genera por bloques
+            text_length = transcript_length(transcript)
+            logger.info("📝 Texto final: %d caracteres", text_length)
+            TRANSCRIPT_CHARACTERS.observe(text_length)
+            TRANSCRIPT_LINES.observe(len(transcript))
             
-            if not transcript:
-                return {
-                    "success": False,
-                    "message": "No se pudo extraer texto de la transcripción."
-                }
-
-            # Unir líneas y crear prompt
-            transcript_text = ' '.join(transcript)
-            print(f"📝 Texto final: {len(transcript_text)} caracteres")
-            
-            if len(transcript_text.strip()) == 0:
+            if not any(fragment.strip() for fragment in transcript):
                 return {
                     "success": False,
                     "message": "El texto extraído está vacío."
                 }
 
-            prompt = f"""I'm going to give you the full transcript of a YouTube video. Please read it and write a summary in Spanish that is clear, well-structured, and easy to understand for someone who hasn't watched the video. It doesn't need to be super short; instead, focus on fully developing the main ideas, key points, and any final conclusions or takeaways. If possible, organize the summary into thematic sections or parts of the content, so it's easier to follow.
-
-Full transcript:
-{transcript_text}"""
-
-            # Preparar datos para guardar
-            output_data = {
+            # Metadatos del archivo; el prompt va entre ambos bloques en el JSON
+            head = {
                 "video_id": video_id,
                 "url": f"https://www.youtube.com/watch?v={video_id}",
                 "processed_at": datetime.now().isoformat(),
-                "transcript_length": len(transcript_text),
-                "prompt": prompt,
+                "transcript_length": text_length,
+            }
+            tail = {
                 "transcript_lines": len(transcript),
                 "file_id": file_id
             }
 
             # Guardar según el formato solicitado
-            if output_format.lower() == "json":
-                output_file = os.path.join(self.output_dir, f"output_{file_id}.json")
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump(output_data, f, ensure_ascii=False, indent=2)
-            else:
-                output_file = os.path.join(self.output_dir, f"output_{file_id}.txt")
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    f.write(prompt)
+            with track_stage("write"):
+                if output_format.lower() == "json":
+                    output_file = os.path.join(self.output_dir, f"output_{file_id}.json")
+                    write_json(output_file, head, transcript, tail, indent=ARTIFACT_JSON_INDENT)
+                else:
+                    output_file = os.path.join(self.output_dir, f"output_{file_id}.txt")
+                    write_txt(output_file, transcript)
 
-            print(f"✅ Archivo guardado: {output_file}")
+            filename = os.path.basename(output_file)
+            size = os.path.getsize(output_file)
+            try:
+                with track_stage("store"):
+                    etag = self.storage.save(filename, output_file)
+            except Exception:
+                # Sin almacenamiento definitivo el archivo local quedaría huérfano
+                if os.path.exists(output_file):
+                    os.remove(output_file)
+                raise
+            self.store.register_artifact(file_id, filename, size, video_id, etag=etag)
+            try:
+                with track_stage("index"):
+                    self.search_index.add(file_id, video_id, transcript, cues["starts"])
+            except Exception as e:
+                # El archivo ya está guardado: un fallo del índice no invalida el resultado
+                logger.warning("⚠️ No se pudo indexar %s: %s", file_id, e, extra={"file_id": file_id})
+            logger.info("✅ Archivo guardado: %s (%s)", filename, self.storage.name, extra={"file_id": file_id})
 
             return {
                 "success": True,
                 "message": "Video procesado exitosamente",
                 "file_path": output_file,
-                "data": output_data
+                "data": {**head, **tail}
             }
 
         except Exception as e:
-            print(f"❌ Error procesando video: {e}")
-            traceback.print_exc()
+            logger.exception("❌ Error procesando video: %s", e)
             return {
                 "success": False,
                 "message": f"Error procesando video: {str(e)}"